@@ -10,7 +10,8 @@
 ###
 
 _imageconv_py_completion() {
-    local OPT_LIST="-- -h --path -p --width --col -c --height --row -r --stride -s --scanline -l --input-type -i --output-type -o --input-yuv-color --output-yuv-color --input-yuv-range --output-yuv-range --normalize -n --keep-name -x --suffix --force -f --verbose -v -j --jump-through"
+    local OPT_LIST="-- -h --path -p --width --col -c --height --row -r --stride -s --scanline -l --input-type -i --output-type -o --input-yuv-color --output-yuv-color --input-yuv-range --output-yuv-range --bayer --normalize -n --keep-name -x --suffix --force -f --verbose -v -j --jump-through -J --jobs -T --threads --no-cache -B --band -F --frames --concat --crop --decimate --watch"
+    local TYPE_LIST="u8 u16 u32 f32 raw10 raw12 bgr rgb rgba bgra yuv nv21 nv12 i420 yv12 yuyv uyvy jpg png bmp csv"
     local cur="${COMP_WORDS[COMP_CWORD]}"
     if [[ "$COMP_CWORD" -gt 1 ]]
     then
@@ -19,8 +20,12 @@ _imageconv_py_completion() {
             '-p'|'--path')
                 COMPREPLY=( $(compgen -d -- "$cur") )
                 return;;
-            '-i'|'--input-type'|'-o'|'--output-type')
-                COMPREPLY=($(compgen -W "u8 u16 u32 f32 bgr rgb rgba bgra yuv nv21 nv12 jpg png bmp csv" -- "$cur"))
+            '-i'|'--input-type')
+                COMPREPLY=($(compgen -W "$TYPE_LIST" -- "$cur"))
+                return;;
+            '-o'|'--output-type')
+                # comma separated list, complete the last item:
+                COMPREPLY=($(compgen -P "${cur%${cur##*,}}" -W "$TYPE_LIST" -- "${cur##*,}"))
                 return;;
             '--input-yuv-color'|'--output-yuv-color')
                 COMPREPLY=($(compgen -W "bt601 bt709 bt2020" -- "$cur"))
@@ -28,7 +33,10 @@ _imageconv_py_completion() {
             '--input-yuv-range'|'--output-yuv-range')
                 COMPREPLY=($(compgen -W "fullrange fullswing videorange studioswing" -- "$cur"))
                 return;;
-            '-c'|'--col'|'--width'|'-r'|'--row'|'--height'|'-s'|'--stride'|'-l'|'--scanline'|'-n'|'--normalize'|'-j'|'--jump-through'|'-x'|'--suffix')
+            '--bayer')
+                COMPREPLY=($(compgen -W "bggr gbrg grbg rggb" -- "$cur"))
+                return;;
+            '-c'|'--col'|'--width'|'-r'|'--row'|'--height'|'-s'|'--stride'|'-l'|'--scanline'|'-n'|'--normalize'|'-j'|'--jump-through'|'-x'|'--suffix'|'-J'|'--jobs'|'-T'|'--threads'|'-B'|'--band'|'-F'|'--frames'|'--crop'|'--decimate')
                 COMPREPLY=()
                 return;;
         esac
@@ -42,7 +50,7 @@ _imageconv_py_completion() {
     fi
 }
 
-complete -F _imageconv_py_completion imageconv.py
+complete -F _imageconv_py_completion imageconv.py imageconvd.py
 
 
 # End of 'imageconv_py_comp.bash' 
@@ -13,10 +13,7 @@
 import os, sys
 import glob
 import numpy as np
-import cv2
-import imageio
 
-TITLE_FONT = cv2.FONT_HERSHEY_SIMPLEX
 TITLE_THICKNESS = 1
 
 def prompt( msg, default) :
@@ -34,6 +31,8 @@ def prompt( msg, default) :
         return prompt( msg, default)
 
 def load_images( files, title='none', font_scale=-1, align_right=False, print_progress=False, orientation='upright'):
+    import cv2
+    title_font = cv2.FONT_HERSHEY_SIMPLEX
     result = []
     input_shape = None
     for idx, path in enumerate( files):
@@ -70,7 +69,7 @@ def load_images( files, title='none', font_scale=-1, align_right=False, print_pr
             input_shape = raw.shape[ :2]
             if font_scale <= 0:
                 font_scale = ( input_shape[ 0] + input_shape[ 1]) / 1000.0
-            title_height = cv2.getTextSize( '', TITLE_FONT, font_scale, TITLE_THICKNESS)[ 0][ 1]
+            title_height = cv2.getTextSize( '', title_font, font_scale, TITLE_THICKNESS)[ 0][ 1]
         elif raw.shape[ :2] != input_shape:
             print( "WARNING: inconsistent size of image '%s', skipped!" % ( path), file = sys.stderr)
             continue
@@ -87,10 +86,10 @@ def load_images( files, title='none', font_scale=-1, align_right=False, print_pr
             else:
                 title_text = ''
             if align_right:
-                offset = title_mat.shape[ 1] - cv2.getTextSize( title_text, TITLE_FONT, font_scale, TITLE_THICKNESS)[ 0][ 0]
+                offset = title_mat.shape[ 1] - cv2.getTextSize( title_text, title_font, font_scale, TITLE_THICKNESS)[ 0][ 0]
             else:
                 offset = 0
-            cv2.putText( title_mat, title_text, ( offset, title_height), TITLE_FONT, font_scale, [ 255, 255, 255], TITLE_THICKNESS)
+            cv2.putText( title_mat, title_text, ( offset, title_height), title_font, font_scale, [ 255, 255, 255], TITLE_THICKNESS)
             raw = np.vstack( ( raw, title_mat))
         result.append( raw)
     return result
@@ -134,6 +133,7 @@ if __name__ == '__main__':
     folder = os.path.dirname( args.output)
     if len( folder) > 0:
         os.makedirs( os.path.dirname( args.output), exist_ok = True)
+    import imageio
     imageio.mimsave( args.output, images, 'GIF', duration = 1/args.framerate)
     print( "[100] DONE.")
 
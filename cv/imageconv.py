@@ -5,28 +5,137 @@
 
 import sys
 import os
+import io
 import glob
+import json
 import argparse
-import cv2 as cv
+import copy
+import threading
+import queue
+import importlib
 import math
+import time
+import struct
+import zlib
 import numpy as np
 
+class LazyModule( object) :
+    # imports the module on first use, paths that never touch it (--help, u16 to u8, ...) skip the import:
+    def __init__( self, name) :
+        self.name = name
+        self.module = None
+
+    def __getattr__( self, attr) :
+        if self.module is None :
+            self.module = importlib.import_module( self.name)
+        value = getattr( self.module, attr)
+        setattr( self, attr, value)
+        return value
+
+cv = LazyModule( "cv2")
+
 DESC_STR = "Convert image(s) as designated format."
 USAGE_STR = "imageconv.py [-h] [-p PATH] [-c COL] [-r ROW] [-s STRIDE] [-l SCANLINE] " + \
-            "[-j BYTES] -i FORMAT -o FORMAT [-n NORMALIZE] " + \
-            "[--] FILE [FILE ...]"
+            "[-j BYTES] [-J JOBS] [-T THREADS] [-B ROWS] [-F FRAMES [--concat]] [--crop X,Y,W,H] [--decimate N] -i FORMAT -o FORMAT[,FORMAT...] [-n NORMALIZE] " + \
+            "[--] FILE [FILE ...] | - | --watch -p PATH FOLDER [FOLDER ...]"
 IMAGE_TYPES = [
     "u8", "u16", "u32", "f32",
+    "raw10", "raw12",
     "bgr", "rgb", "rgba", "bgra",
-    "yuv", "nv21", "nv12",
+    "yuv", "nv21", "nv12", "i420", "yv12", "yuyv", "uyvy",
     "jpg", "png", "bmp",
     "csv",
 ]
+# samples per 8-bit level of 1-channel integer input, which is carried through without going to float:
+RAW_UNITS = {
+    "u8" : 1,
+    "u16" : 256,
+    "raw10" : 4,
+    "raw12" : 16,
+    "u32" : 16777216,
+}
+# MIPI packed raw: ( pixels, bytes) of each group:
+RAW_PACKINGS = {
+    "raw10" : ( 4, 5),
+    "raw12" : ( 2, 3),
+}
+# opencv names bayer codes after the second row, so RGGB is its BayerBG:
+BAYER_CODES = {
+    "rggb" : "COLOR_BayerBG2BGR",
+    "bggr" : "COLOR_BayerRG2BGR",
+    "grbg" : "COLOR_BayerGB2BGR",
+    "gbrg" : "COLOR_BayerGR2BGR",
+}
+BAYER_INPUT_TYPES = [ "u8", "u16", "raw10", "raw12"]
+# chroma subsampled layouts, 4:2:0 ones take 1.5 bytes per pixel:
+YUV420_TYPES = [ "nv21", "nv12", "i420", "yv12"]
+YUV422_TYPES = [ "yuyv", "uyvy"]
+# opencv decodes these only as bt601 video-range:
+YUV2BGR_CODES = {
+    "nv21" : "COLOR_YUV2BGR_NV21",
+    "nv12" : "COLOR_YUV2BGR_NV12",
+    "i420" : "COLOR_YUV2BGR_I420",
+    "yv12" : "COLOR_YUV2BGR_YV12",
+    "yuyv" : "COLOR_YUV2BGR_YUYV",
+    "uyvy" : "COLOR_YUV2BGR_UYVY",
+}
 YUV_COLOR_STDS = [ "bt601", "bt709", "bt2020"]
 YUV_RANGES = [
     "fullrange", "fullswing",
     "videorange", "studioswing",
 ]
+# ( width, height) of common sensor outputs, tried before guessing:
+KNOWN_RESOLUTIONS = [
+    ( 176, 144), ( 320, 240), ( 352, 288), ( 640, 480),
+    ( 720, 480), ( 720, 576), ( 800, 600), ( 1024, 768),
+    ( 1280, 720), ( 1280, 960), ( 1280, 1024), ( 1600, 1200),
+    ( 1920, 1080), ( 1920, 1088), ( 2048, 1536), ( 2560, 1440),
+    ( 2592, 1944), ( 3264, 2448), ( 3840, 2160), ( 4000, 3000),
+    ( 4032, 3024), ( 4096, 2160), ( 4608, 3456), ( 8000, 6000),
+]
+# ( R-V, G-U, G-V, B-U) for full-range and video-range, Y gain is 1.0 and 1.16438356:
+YUV2BGR_COEFFS = {
+    "bt601" : ( ( 1.402, 0.34413629, 0.71413629, 1.772),
+                ( 1.59602679, 0.39176229, 0.81296765, 2.01723214)),
+    "bt709" : ( ( 1.5748, 0.18732427, 0.46812427, 1.8556),
+                ( 1.79274107, 0.21324861, 0.53290933, 2.11240179)),
+    "bt2020" : ( ( 1.4746, 0.16455313, 0.57135313, 1.8814),
+                 ( 1.67867411, 0.18732610, 0.65042432, 2.14177232)),
+}
+yuv2bgr_kernels = {}
+# ( R, G, B) weights of Y, U and V for full-range and video-range:
+BGR2YUV_COEFFS = {
+    "bt601" : ( ( ( 0.299, 0.587, 0.114),
+                  ( -0.168736, -0.331264, 0.5),
+                  ( 0.5, -0.418688, -0.081312)),
+                ( ( 0.25678824, 0.50412941, 0.09790588),
+                  ( -0.14822300, -0.29099269, 0.43921569),
+                  ( 0.43921569, -0.36778867, -0.07142701))),
+    "bt709" : ( ( ( 0.2126, 0.7152, 0.0722),
+                  ( -0.11457211, -0.38542789, 0.5),
+                  ( 0.5, -0.45415291, -0.04584709)),
+                ( ( 0.18258588, 0.61423059, 0.06200706),
+                  ( -0.10064373, -0.33857195, 0.43921569),
+                  ( 0.43921569, -0.39894216, -0.04027352))),
+    "bt2020" : ( ( ( 0.2627, 0.6780, 0.0593),
+                   ( -0.13963006, -0.36036994, 0.5),
+                   ( 0.5, -0.45978570, -0.04021430)),
+                 ( ( 0.22561294, 0.58228235, 0.05092824),
+                   ( -0.12265543, -0.31656026, 0.43921569),
+                   ( 0.43921569, -0.40389019, -0.03532550))),
+}
+bgr2yuv_kernels = {}
+GEOMETRY_CACHE = os.path.join( os.path.expanduser( "~"), ".cache", ".imageconv", "geometry.json")
+geometry_cache = {}
+# outputs waiting for the writer thread, bounds the memory it holds:
+OUTPUT_QUEUE_DEPTH = 4
+# frames are colour converted in row bands of at least this many rows, one band per opencv thread:
+TILE_MIN_ROWS = 128
+tile_pools = {}
+# --watch: files converted so far go into this file of the output folder,
+#   a file counts as complete once its size and mtime stay the same for WATCH_SETTLE seconds:
+WATCH_STATE = ".imageconv-watch.json"
+WATCH_SETTLE = 1.0
 
 def verbose( info) :
     print( info[ "filename"] + ":")
@@ -68,285 +177,485 @@ def prompt( msg, default) :
     else :
         return prompt( msg, default)
 
-def mat_2_file_or_stdout( mat, path):
+def mat_2_file_or_stdout( mat, path, append = False):
+    # write the memory of the array itself, only views with gaps need a contiguous copy first:
+    if not mat.flags.c_contiguous :
+        mat = np.ascontiguousarray( mat)
+    data = memoryview( mat.reshape( -1).view( np.uint8))
     if os.path.abspath( path) == '/dev/stdout':
         with os.fdopen( sys.stdout.fileno(), 'wb', closefd=False) as stdout:
-            stdout.write( mat.tobytes())
+            stdout.write( data)
     else:
-        mat.tofile( path)
+        with open( path, 'ab' if append else 'wb') as out:
+            out.write( data)
+
+class OutputWriter( object) :
+    # writes outputs in a thread of its own, so converting the next image overlaps with writing this one;
+    # queued arrays must stay untouched, producers hand over new arrays or views of read-only input:
+    def __init__( self, depth) :
+        self.queue = queue.Queue( depth)
+        self.errors = []
+        self.failures = 0
+        self.thread = threading.Thread( target = self.run, daemon = True)
+        self.thread.start()
+
+    def run( self) :
+        while True :
+            task = self.queue.get()
+            try :
+                if task is None :
+                    return
+                mat, path, append = task
+                try :
+                    mat_2_file_or_stdout( mat, path, append)
+                except Exception as e :
+                    self.errors.append( "Warning: failed writing '" + path + "': " + str( e))
+            finally :
+                self.queue.task_done()
+
+    def report( self) :
+        # print from the converting thread, whose stderr may be captured:
+        while len( self.errors) > 0 :
+            print( self.errors.pop( 0), file = sys.stderr)
+            self.failures += 1
+
+    def put( self, mat, path, append) :
+        self.report()
+        self.queue.put( ( mat, path, append))
+
+    def wait( self) :
+        self.queue.join()
+        self.report()
+
+    def close( self) :
+        self.queue.put( None)
+        self.thread.join()
+        self.report()
+        return self.failures
+
+def map_file( filename, offset) :
+    # map input read-only instead of reading it, so only the pages the decoders touch get loaded:
+    if os.path.getsize( filename) <= offset :
+        return np.empty( 0, dtype = np.uint8)
+    return np.asarray( np.memmap( filename, dtype = np.uint8, mode = "r", offset = offset))
+
+def overwrites_input( filename, args) :
+    # outputs may be views of the mapped input, which writing the output over it would truncate:
+    for out_args in output_args( args) :
+        info = output_info( { "filename" : os.path.basename( filename)}, out_args)
+        if is_same_path( info[ "output"], filename) :
+            return True
+    return False
+
+def count_lines( filename) :
+    lines = 1
+    with open( filename, 'rb') as inp :
+        for block in iter( lambda : inp.read( 1 << 20), b'') :
+            lines += block.count( b'\n')
+    return lines
+
+def load_csv( filename, jump_through) :
+    # size the sheet from the line count, so rows are parsed straight into it:
+    capacity = max( count_lines( filename) - jump_through, 0)
+    with open( filename, 'r', newline = '') as csv_file:
+        return read_csv( csv_file, jump_through, capacity)
+
+def read_csv( csv_file, jump_through, capacity, sniff_bytes = 1 << 16, block_cells = 1 << 16) :
+    import csv
+    import itertools
+    sample = csv_file.read( sniff_bytes)
+    if len( sample) >= sniff_bytes and '\n' in sample :
+        sample = sample[ : sample.rindex( '\n')]
+    try :
+        dialect = csv.Sniffer().sniff( sample)
+    except csv.Error :
+        dialect = csv.excel
+    csv_file.seek( 0)
+    reader = csv.reader( csv_file, dialect)
+    rows = ( row for row in itertools.islice( reader, jump_through, None) if len( row) > 0)
+    first = next( rows, None)
+    if first is None :
+        return np.empty( ( 0, 0), dtype = np.float32)
+    columns = len( first)
+    sheet = np.empty( ( capacity, columns), dtype = np.float32)
+    rows = itertools.chain( [ first], rows)
+    block_rows = max( 1, block_cells // columns)
+    count = 0
+    while True :
+        block = list( itertools.islice( rows, block_rows))
+        if len( block) <= 0 :
+            break
+        for row in block :
+            if len( row) != columns :
+                raise ValueError( "inconsistent number of columns within csv")
+        cells = np.fromiter( map( float, itertools.chain.from_iterable( block)), dtype = np.float64, count = len( block) * columns)
+        if count + len( block) > sheet.shape[ 0] :
+            # rows may also end with a bare '\r', which the line count misses:
+            grown = np.empty( ( max( sheet.shape[ 0] * 2, count + len( block)), columns), dtype = np.float32)
+            grown[ : count] = sheet[ : count]
+            sheet = grown
+        sheet[ count : count + len( block)] = cells.reshape( len( block), columns)
+        count += len( block)
+    return sheet[ : count]
+
+def pixel_series( original, pixel_bytes, pixel_count, args) :
+    # view leading pixels in place, one row per pixel for multi-channel data:
+    data = original[ : pixel_count * pixel_bytes]
+    if args.input_type in [ "bgr", "rgb", "yuv", "bgra", "rgba"] + YUV422_TYPES :
+        return data.reshape( pixel_count, pixel_bytes)
+    elif pixel_bytes == 1 :
+        return data
+    elif pixel_bytes == 2 :
+        return data.view( np.uint16)
+    elif pixel_bytes == 4 and args.input_type == "f32" :
+        return data.view( np.float32)
+    elif pixel_bytes == 4 :
+        return data.view( np.uint32)
+    print( "ERROR: internal error pixel_series()", file = sys.stderr)
+    exit( 1)
+
+def row_correlation( series, max_lag) :
+    # normalized autocorrelation for lags [0, max_lag], from a few chunks spread over the data:
+    length = min( len( series), max( 1 << 16, max_lag * 8))
+    count = min( 8, len( series) // length)
+    starts = np.linspace( 0, len( series) - length, count).astype( np.int64)
+    chunks = np.empty( ( count, length), dtype = np.float64)
+    for idx, start in enumerate( starts) :
+        chunk = series[ start : start + length]
+        if chunk.ndim > 1 :
+            chunk = chunk.sum( axis = 1, dtype = np.float64)
+        chunks[ idx] = chunk
+    chunks = np.nan_to_num( chunks)
+    chunks -= chunks.mean( axis = 1, keepdims = True)
+    fft_size = 1 << int( math.ceil( math.log( length * 2, 2)))
+    spectrum = np.fft.rfft( chunks, fft_size, axis = 1)
+    spectrum = ( spectrum * spectrum.conj()).real.sum( axis = 0)
+    correlation = np.fft.irfft( spectrum, fft_size)[ : max_lag + 1]
+    correlation /= ( length - np.arange( max_lag + 1)) * count
+    if correlation[ 0] <= 0 :
+        return np.zeros( max_lag + 1)
+    return correlation / correlation[ 0]
+
+def lag_correlation( series, lags) :
+    # normalized autocorrelation of a leading chunk, for a few lags only:
+    length = min( len( series), max( 1 << 16, max( lags) * 8))
+    chunk = series[ : length]
+    if chunk.ndim > 1 :
+        chunk = chunk.sum( axis = 1, dtype = np.float64)
+    chunk = np.nan_to_num( chunk.astype( np.float64))
+    chunk -= chunk.mean()
+    return [ np.dot( chunk[ : length - lag], chunk[ lag :]) / ( length - lag) for lag in lags]
+
+def known_width( original, pixel_bytes, args) :
+    size = len( original)
+    if args.input_type in YUV420_TYPES :
+        if size % 3 != 0 :
+            return None
+        size = size * 2 // 3
+    if size % pixel_bytes != 0 :
+        return None
+    pixel_count = size // pixel_bytes
+    for width, height in KNOWN_RESOLUTIONS :
+        if width * height == pixel_count :
+            # same pixel count either way round, keep the orientation whose rows line up:
+            series = pixel_series( original, pixel_bytes, pixel_count, args)
+            landscape, portrait = lag_correlation( series, [ width, height])
+            return width if landscape >= portrait else height
+    return None
+
+def load_geometry_cache() :
+    try :
+        with open( GEOMETRY_CACHE, "r") as inp :
+            return json.load( inp)
+    except :
+        return {}
+
+def save_geometry_cache( cache) :
+    try :
+        folder = os.path.dirname( GEOMETRY_CACHE)
+        if not os.path.isdir( folder) :
+            os.makedirs( folder)
+        # write aside then rename, parallel jobs may update the cache at the same time:
+        temp = GEOMETRY_CACHE + "." + str( os.getpid()) + "." + str( threading.get_ident())
+        with open( temp, "w") as out :
+            json.dump( cache, out, indent = 1, sort_keys = True)
+        os.replace( temp, GEOMETRY_CACHE)
+    except Exception as e :
+        print( "Warning: failed saving geometry cache: " + str( e), file = sys.stderr)
+
+def resolve_width( original, pixel_bytes, args) :
+    width = known_width( original, pixel_bytes, args)
+    if width is not None :
+        return width
+    if args.no_cache :
+        return guess_width( original, pixel_bytes, args)
+    key = "%d:%s:%d" % ( len( original) + args.jump_through, args.input_type, args.jump_through)
+    if key not in geometry_cache :
+        # a resident server keeps what it has read, only sizes it has not seen go to disk:
+        geometry_cache.update( load_geometry_cache())
+    # caches written before widths were checked may hold 0:
+    if key in geometry_cache and int( geometry_cache[ key]) > 0 :
+        return int( geometry_cache[ key])
+    width = guess_width( original, pixel_bytes, args)
+    if width <= 0 :
+        return width
+    geometry_cache[ key] = width
+    # merge into what is on disk now, other processes may have added sizes meanwhile:
+    cache = load_geometry_cache()
+    cache[ key] = width
+    save_geometry_cache( cache)
+    return width
 
 def guess_width( original, pixel_bytes, args) :
     pixel_count = len( original) // pixel_bytes
-    if args.input_type.startswith( "nv") :
+    if args.input_type in YUV420_TYPES :
         pixel_count = pixel_count * 2 // 3
-    array = np.copy( original[ : pixel_count * pixel_bytes])
-    if pixel_bytes == 1:
-        pass
-    elif pixel_bytes == 2 :
-        array = np.frombuffer( array.data, dtype = np.uint16)
-    elif pixel_bytes == 3 :
-        mixed = np.empty( pixel_count * 4, dtype = np.uint8)
-        mixed[ 0::4] = array[ 0::3]
-        mixed[ 1::4] = array[ 1::3]
-        mixed[ 2::4] = array[ 2::3]
-        mixed[ 3::4] = 0
-        array = np.frombuffer( mixed.data, dtype = np.uint32)
-    elif pixel_bytes == 4 :
-        array = np.frombuffer( array.data, dtype = np.uint32)
-    else :
-        print( "ERROR: internal error guess_width()", file = sys.stderr)
-        exit( 1)
-    min_width = int( math.floor( math.sqrt( pixel_count) / 2))
+    min_width = max( int( math.floor( math.sqrt( pixel_count) / 2)), 1)
     max_width = pixel_count // min_width
-    peak = 0
-    best_ratio = 1
-    result = int( round( math.sqrt( pixel_count)))
-    for width in range( min_width, max_width) :
-        height = pixel_count // width
-        if args.input_type.startswith( "nv") :
-            if width % 2 != 0 :
-                continue
-            if height % 2 != 0 :
-                height -= 1
-                if height <= 0 :
-                    continue
-        step = 23 if width > 160 else 1
-        reshaped = array[ : width * height].reshape( height, width)
-        part1 = reshaped[ 0 : height - 1 : step]
-        part2 = reshaped[ 1 : height : step]
-        probability = ( part1 == part2).mean()
-        if probability > peak :
-            peak = probability
-            result = width
-        elif probability == peak :
-            ratio = abs( width / height - 1)
-            if ratio < best_ratio :
-                best_ratio = ratio
-                result = width
-    return result
+    widths = np.arange( min_width, max_width)
+    if args.input_type in YUV420_TYPES :
+        widths = widths[ widths % 2 == 0]
+        widths = widths[ pixel_count // widths >= 2]
+    elif args.input_type in YUV422_TYPES :
+        widths = widths[ widths % 2 == 0]
+    if len( widths) <= 0 :
+        return int( round( math.sqrt( pixel_count)))
+    # adjacent rows are most alike when the width is right:
+    series = pixel_series( original, pixel_bytes, pixel_count, args)
+    scores = row_correlation( series, int( widths[ -1]))[ widths]
+    best = widths[ scores >= scores.max()]
+    ratios = np.abs( best / ( pixel_count // best) - 1)
+    return int( best[ np.argmin( ratios)])
 
-def normalize( mat, info, args) :
-    if args.normalize == None :
-        norm_max = -1
-    elif args.normalize > 0 :
-        norm_max = args.normalize
-    else:
-        norm_max = 0
-    if args.input_type in [ "u8", "u16", "u32", "f32"] :
-        mat_max = mat.max()
-        info[ "range"] = "[" + str( mat.min()) + "," + str( mat_max) + "]"
-        if norm_max == 0 :
-            norm_max = mat_max
-        if norm_max <= 0 :
-            if args.input_type == "u16" :
-                return mat.astype( np.float32) / 256.0
-            elif args.input_type == 'u32':
-                return mat.astype( np.float32) / 16777216.0
-            elif args.input_type == "f32" :
-                return mat.astype( np.float32) * 255.0
-            else :
-                return mat.astype( np.float32)
+def level_unit( mat, info) :
+    # samples per 8-bit level of a mat that kept its integer input type, None for 0~255 float:
+    if not np.issubdtype( mat.dtype, np.integer) :
+        return None
+    return info.get( "unit", 1) if info[ "channel"] == 1 else 1
+
+def round_divide( mat, divisor) :
+    # integer division rounding half to even, the way np.rint() rounds:
+    quotient, remainder = np.divmod( mat, divisor)
+    half = divisor // 2
+    if divisor % 2 == 0 :
+        quotient += ( remainder > half) | ( ( remainder == half) & ( quotient & 1 == 1))
+    else :
+        quotient += remainder > half
+    return quotient
+
+def rescale( mat, source, target, dtype) :
+    # integer samples from source to target units per 8-bit level, saturated to dtype, floats never get involved:
+    if target == source :
+        out = mat
+    elif target % source == 0 :
+        factor = target // source
+        wide = np.promote_types( mat.dtype, np.min_scalar_type( int( np.iinfo( mat.dtype).max) * factor))
+        out = mat.astype( wide)
+        out *= factor
+    elif source % target == 0 :
+        out = round_divide( mat, source // target)
+    else :
+        out = mat.astype( np.uint64)
+        out *= target
+        out = round_divide( out, source)
+    if np.iinfo( out.dtype).max > np.iinfo( dtype).max :
+        out = np.minimum( out, np.iinfo( dtype).max)
+    return out.astype( dtype, copy = False)
+
+def gray_u8( mat, info) :
+    unit = level_unit( mat, info)
+    if unit is not None :
+        return rescale( mat, unit, 1, np.uint8)
+    return np.uint8( np.rint( mat))
+
+# scale 1-channel input to 0~255 float32, norm_max comes from measure_raw():
+def normalize( mat, norm_max, args) :
+    if norm_max <= 0 :
+        if args.input_type == "u16" :
+            return mat.astype( np.float32) / 256.0
+        elif args.input_type == "raw10" :
+            return mat.astype( np.float32) / 4.0
+        elif args.input_type == "raw12" :
+            return mat.astype( np.float32) / 16.0
+        elif args.input_type == 'u32':
+            return mat.astype( np.float32) / 16777216.0
+        elif args.input_type == "f32" :
+            return mat.astype( np.float32) * 255.0
         else :
-            return np.clip( mat.astype( np.float32), 0, norm_max) * 255.0 / norm_max
-    elif args.input_type in [ "bgr", "rgb", "rgba", "bgra"] :
-        if norm_max >= 0:
-            print( "Warning: option -n/--normalize only works with 1-channel input, ignored.", file = sys.stderr)
-        b = mat[ :, :, 0]
-        g = mat[ :, :, 1]
-        r = mat[ :, :, 2]
-        info[ "b_range"] = "[" + str( b.min()) + "," + str( b.max()) + "]"
-        info[ "g_range"] = "[" + str( g.min()) + "," + str( g.max()) + "]"
-        info[ "r_range"] = "[" + str( r.min()) + "," + str( r.max()) + "]"
-        if info[ "channel"] >= 4 :
-            a = mat[ :, :, 3]
-            info[ "a_range"] = "[" + str( a.min()) + "," + str( a.max()) + "]"
-        return mat
+            return mat.astype( np.float32)
     else :
-        return mat
+        return np.clip( mat.astype( np.float32), 0, norm_max) * 255.0 / norm_max
 
-def yuv2bgr( yuv_mat, standard, fullrange, info, args) :
-    if args.normalize != None :
-        print( "Warning: option -n, --normalize only work with 1-channel input, ignored.", file = sys.stderr)
-    y = yuv_mat[ :, :, 0]
+def yuv2bgr_kernel( standard, fullrange) :
+    # 3x4 YUV->BGR matrix plus clamping table for video-range, built once per standard & range:
+    key = ( standard, fullrange)
+    if key in yuv2bgr_kernels :
+        return yuv2bgr_kernels[ key]
+    if standard not in YUV2BGR_COEFFS :
+        print( "ERROR: internal error yuv2bgr()", file = sys.stderr)
+        exit( 1)
+    if fullrange :
+        y_gain, y_offset, c_offset = 1.0, 0.0, 127.5
+        r_v, g_u, g_v, b_u = YUV2BGR_COEFFS[ standard][ 0]
+        clamp = None
+    else : # if video-range
+        y_gain, y_offset, c_offset = 1.16438356, 16.0, 128.0
+        r_v, g_u, g_v, b_u = YUV2BGR_COEFFS[ standard][ 1]
+        values = np.arange( 256)
+        clamp = np.empty( ( 1, 256, 3), dtype = np.uint8)
+        clamp[ 0, :, 0] = np.clip( values, 16, 235)
+        clamp[ 0, :, 1] = np.clip( values, 16, 240)
+        clamp[ 0, :, 2] = np.clip( values, 16, 240)
+    matrix = np.array( [
+        [ y_gain, b_u, 0, -y_gain * y_offset - b_u * c_offset],
+        [ y_gain, -g_u, -g_v, -y_gain * y_offset + ( g_u + g_v) * c_offset],
+        [ y_gain, 0, r_v, -y_gain * y_offset - r_v * c_offset],
+    ], dtype = np.float32)
+    yuv2bgr_kernels[ key] = ( matrix, clamp)
+    return matrix, clamp
+
+# returns False if video-range data exceed the legal range:
+def check_yuv_ranges( y, u, v, fullrange, info) :
     y_min = y.min()
     y_max = y.max()
-    u = yuv_mat[ :, :, 1]
     u_min = u.min()
     u_max = u.max()
-    v = yuv_mat[ :, :, 2]
     v_min = v.min()
     v_max = v.max()
     info[ "y_range"] = "[" + str( y_min) + "," + str( y_max) + "]"
     info[ "u_range"] = "[" + str( u_min) + "," + str( u_max) + "]"
     info[ "v_range"] = "[" + str( v_min) + "," + str( v_max) + "]"
-    if fullrange :
-        yy = y.astype( np.float)
-        uu = u.astype( np.float) - 127.5
-        vv = v.astype( np.float) - 127.5
-        if standard == "bt601" :
-            r = np.clip( yy + 1.402 * vv, 0, 255).round().astype( np.uint8)
-            g = np.clip( yy - 0.34413629 * uu - 0.71413629 * vv, 0, 255).round().astype( np.uint8)
-            b = np.clip( yy + 1.772 * uu, 0, 255).round().astype( np.uint8)
-        elif standard == "bt709" :
-            r = np.clip( yy + 1.5748 * vv, 0, 255).round().astype( np.uint8)
-            g = np.clip( yy - 0.18732427 * uu - 0.46812427 * vv, 0, 255).round().astype( np.uint8)
-            b = np.clip( yy + 1.8556 * uu, 0, 255).round().astype( np.uint8)
-        elif standard == "bt2020" :
-            r = np.clip( yy + 1.4746 * vv, 0, 255).round().astype( np.uint8)
-            g = np.clip( yy - 0.16455313 * uu - 0.57135313 * vv, 0, 255).round().astype( np.uint8)
-            b = np.clip( yy + 1.8814 * uu, 0, 255).round().astype( np.uint8)
-        else :
-            print( "ERROR: internal error yuv2bgr()", file = sys.stderr)
-            exit( 1)
-    else : # if video-range
+    in_range = True
+    if not fullrange : # if video-range
         if y_min < 16 or y_max > 235 :
             print( "Warning: Y-channel data exceed video-range!", file = sys.stderr)
+            in_range = False
         if u_min < 16 or u_max > 240 :
             print( "Warning: U-channel data exceed video-range!", file = sys.stderr)
+            in_range = False
         if v_min < 16 or v_max > 240 :
             print( "Warning: V-channel data exceed video-range!", file = sys.stderr)
-        yy = np.clip( y, 16, 235).astype( np.float) - 16
-        uu = np.clip( u, 16, 240).astype( np.float) - 128
-        vv = np.clip( v, 16, 240).astype( np.float) - 128
-        if standard == "bt601" :
-            r = np.clip( 1.16438356 * yy + 1.59602679 * vv, 0, 255).round().astype( np.uint8)
-            g = np.clip( 1.16438356 * yy - 0.39176229 * uu - 0.81296765 * vv, 0, 255).round().astype( np.uint8)
-            b = np.clip( 1.16438356 * yy + 2.01723214 * uu, 0, 255).round().astype( np.uint8)
-        elif standard == "bt709" :
-            r = np.clip( 1.16438356 * yy + 1.79274107 * vv, 0, 255).round().astype( np.uint8)
-            g = np.clip( 1.16438356 * yy - 0.21324861 * uu - 0.53290933 * vv, 0, 255).round().astype( np.uint8)
-            b = np.clip( 1.16438356 * yy + 2.11240179 * uu, 0, 255).round().astype( np.uint8)
-        elif standard == "bt2020" :
-            r = np.clip( 1.16438356 * yy + 1.67867411 * vv, 0, 255).round().astype( np.uint8)
-            g = np.clip( 1.16438356 * yy - 0.18732610 * uu - 0.65042432 * vv, 0, 255).round().astype( np.uint8)
-            b = np.clip( 1.16438356 * yy + 2.14177232 * uu, 0, 255).round().astype( np.uint8)
-        else :
-            print( "ERROR: internal error yuv2bgr()", file = sys.stderr)
-            exit( 1)
-    bgr = np.empty( yuv_mat.shape, dtype = np.uint8)
-    bgr[ :, :, 0] = b
-    bgr[ :, :, 1] = g
-    bgr[ :, :, 2] = r
+            in_range = False
+    return in_range
+
+def run_tiled( work, rows) :
+    # call work( top, bottom) for row bands side by side, opencv and numpy release the GIL meanwhile;
+    #   as many bands as cv.getNumThreads(), so cv.setNumThreads() and -T/--threads bound both.
+    threads = cv.getNumThreads()
+    count = min( threads, rows // TILE_MIN_ROWS)
+    if count <= 1 :
+        work( 0, rows)
+        return
+    if threads not in tile_pools :
+        import concurrent.futures
+        tile_pools[ threads] = concurrent.futures.ThreadPoolExecutor( threads)
+    bounds = [ rows * idx // count for idx in range( count + 1)]
+    bands = [ tile_pools[ threads].submit( work, bounds[ idx], bounds[ idx + 1]) for idx in range( count)]
+    for band in bands :
+        band.result()
+
+def yuv_transform( yuv_mat, standard, fullrange) :
+    matrix, clamp = yuv2bgr_kernel( standard, fullrange)
+    bgr = np.empty( yuv_mat.shape[ : 2] + ( 3,), dtype = yuv_mat.dtype)
+    def work( top, bottom) :
+        band = yuv_mat[ top : bottom]
+        if clamp is not None :
+            band = cv.LUT( band, clamp)
+        # 8-bit cv.transform() runs in fixed-point and saturates straight into the output:
+        cv.transform( band, matrix, dst = bgr[ top : bottom])
+    run_tiled( work, yuv_mat.shape[ 0])
     return bgr
 
-def bgr2yuv( bgr_mat, standard, fullrange) :
-    b = bgr_mat[ :, :, 0]
-    g = bgr_mat[ :, :, 1]
-    r = bgr_mat[ :, :, 2]
+def bgr2yuv_kernel( standard, fullrange) :
+    # 3x4 BGR->YUV matrix, built once per standard & range:
+    key = ( standard, fullrange)
+    if key in bgr2yuv_kernels :
+        return bgr2yuv_kernels[ key]
+    if standard not in BGR2YUV_COEFFS :
+        print( "ERROR: internal error bgr2yuv()", file = sys.stderr)
+        exit( 1)
     if fullrange :
-        if standard == "bt601" :
-            y = ( 0.299 * r + 0.587 * g + 0.114 * b).round().astype( np.uint8)
-            u = ( -0.168736 * r - 0.331264 * g + 0.5 * b + 127.5).round().astype( np.uint8)
-            v = ( 0.5 * r - 0.418688 * g - 0.081312 * b + 127.5).round().astype( np.uint8)
-        elif standard == "bt709" :
-            y = ( 0.2126 * r + 0.7152 * g + 0.0722 * b).round().astype( np.uint8)
-            u = ( -0.11457211 * r - 0.38542789 * g + 0.5 * b + 127.5).round().astype( np.uint8)
-            v = ( 0.5 * r - 0.45415291 * g - 0.04584709 * b + 127.5).round().astype( np.uint8)
-        elif standard == "bt2020" :
-            y = ( 0.2627 * r + 0.6780 * g + 0.0593 * b).round().astype( np.uint8)
-            u = ( -0.13963006 * r - 0.36036994 * g + 0.5 * b + 127.5).round().astype( np.uint8)
-            v = ( 0.5 * r - 0.45978570 * g - 0.04021430 * b + 127.5).round().astype( np.uint8)
-        else :
-            print( "ERROR: internal error bgr2yuv()", file = sys.stderr)
-            exit( 1)
+        rows = BGR2YUV_COEFFS[ standard][ 0]
+        offsets = ( 0, 127.5, 127.5)
     else : # if video-range
-        if standard == "bt601" :
-            y = ( 0.25678824 * r + 0.50412941 * g + 0.09790588 * b + 16).round().astype( np.uint8)
-            u = ( -0.14822300 * r - 0.29099269 * g + 0.43921569 * b + 128).round().astype( np.uint8)
-            v = ( 0.43921569 * r - 0.36778867 * g - 0.07142701 * b + 128).round().astype( np.uint8)
-        elif standard == "bt709" :
-            y = ( 0.18258588 * r + 0.61423059 * g + 0.06200706 * b + 16).round().astype( np.uint8)
-            u = ( -0.10064373 * r - 0.33857195 * g + 0.43921569 * b + 128).round().astype( np.uint8)
-            v = ( 0.43921569 * r - 0.39894216 * g - 0.04027352 * b + 128).round().astype( np.uint8)
-        elif standard == "bt2020" :
-            y = ( 0.22561294 * r + 0.58228235 * g + 0.05092824 * b + 16).round().astype( np.uint8)
-            u = ( -0.12265543 * r - 0.31656026 * g + 0.43921569 * b + 128).round().astype( np.uint8)
-            v = ( 0.43921569 * r - 0.40389019 * g - 0.03532550 * b + 128).round().astype( np.uint8)
-        else :
-            print( "ERROR: internal error bgr2yuv()", file = sys.stderr)
-            exit( 1)
-    return y, u, v
+        rows = BGR2YUV_COEFFS[ standard][ 1]
+        offsets = ( 16, 128, 128)
+    matrix = np.array( [ [ b, g, r, offset] for ( r, g, b), offset in zip( rows, offsets)], dtype = np.float32)
+    bgr2yuv_kernels[ key] = matrix
+    return matrix
 
-def save_bgr2yuv( bgr_mat, standard, fullrange, info) :
-    height = int( info[ "height"])
-    width = int( info[ "width"])
-    y, u, v = bgr2yuv( bgr_mat, standard, fullrange)
-    yuv = np.empty( ( height, width, 3), dtype = np.uint8)
-    yuv[ :, :, 0] = y
-    yuv[ :, :, 1] = u
-    yuv[ :, :, 2] = v
-    # yuv.tofile( info[ "output"])
-    mat_2_file_or_stdout( yuv, info[ "output"])
+# returns packed ( height, width, 3) YUV:
+def bgr2yuv( bgr_mat, standard, fullrange) :
+    matrix = bgr2yuv_kernel( standard, fullrange)
+    if bgr_mat.shape[ 2] == 4 : # ignore alpha
+        matrix = np.insert( matrix, 3, 0, axis = 1)
+    yuv = np.empty( bgr_mat.shape[ : 2] + ( 3,), dtype = bgr_mat.dtype)
+    def work( top, bottom) :
+        cv.transform( bgr_mat[ top : bottom], matrix, dst = yuv[ top : bottom])
+    run_tiled( work, bgr_mat.shape[ 0])
+    return yuv
 
-def save_bgr2nv21( bgr_mat, standard, fullrange, info) :
-    height = int( info[ "height"])
-    width = int( info[ "width"])
-    y, u, v = bgr2yuv( bgr_mat, standard, fullrange)
-    vu = np.empty( ( height // 2, width), dtype = np.uint8)
-    for i in range( 0, height // 2) :
-        for j in range( 0, width // 2) :
-            ox = i * 2
-            oy = j * 2
-            sum_u = int( u[ ox, oy])
-            sum_u += u[ ox + 1, oy]
-            sum_u += u[ ox, oy + 1]
-            sum_u += u[ ox + 1, oy + 1]
-            sum_v = int( v[ ox, oy])
-            sum_v += v[ ox + 1, oy]
-            sum_v += v[ ox, oy + 1]
-            sum_v += v[ ox + 1, oy + 1]
-            vu[ i, j * 2] = sum_v / 4.0
-            vu[ i, j * 2 + 1] = sum_u / 4.0
-    vu = np.uint8( np.rint( vu))
-    nv21 = np.concatenate( ( y, vu))
-    # nv21.tofile( info[ "output"])
-    mat_2_file_or_stdout( nv21, info[ "output"])
-
-def save_bgr2nv12( bgr_mat, standard, fullrange, info) :
-    height = info[ "height"]
-    width = info[ "width"]
-    y, u, v = bgr2yuv( bgr_mat, standard, fullrange)
-    uv = np.empty( ( height / 2, width), dtype = np.uint8)
-    for i in range( 0, height / 2) :
-        for j in range( 0, width / 2) :
-            ox = i * 2
-            oy = j * 2
-            sum_u = int( u[ ox, oy])
-            sum_u += u[ ox + 1, oy]
-            sum_u += u[ ox, oy + 1]
-            sum_u += u[ ox + 1, oy + 1]
-            sum_v = int( v[ ox, oy])
-            sum_v += v[ ox + 1, oy]
-            sum_v += v[ ox, oy + 1]
-            sum_v += v[ ox + 1, oy + 1]
-            uv[ i, j * 2] = sum_u / 4.0
-            uv[ i, j * 2 + 1] = sum_v / 4.0
-    uv = np.uint8( np.rint( uv))
-    nv12 = np.concatenate( ( y, uv))
-    # nv12.tofile( info[ "output"])
-    mat_2_file_or_stdout( nv12, info[ "output"])
+def box_average_2x2( plane) :
+    # mean of each 2x2 block, truncated the same way as assigning sum / 4.0 into uint8:
+    height, width = plane.shape[ : 2]
+    blocks = plane[ : height // 2 * 2, : width // 2 * 2].reshape( height // 2, 2, width // 2, 2)
+    return ( blocks.sum( axis = ( 1, 3), dtype = np.uint16) >> 2).astype( np.uint8)
+
+def interleave_chroma( first, second, plane) :
+    # subsample two full-size chroma planes and interleave them into a semi-planar plane:
+    plane[ :, 0::2] = box_average_2x2( first)
+    plane[ :, 1::2] = box_average_2x2( second)
+
+def yuv2nv( yuv, vu_order) :
+    height, width = yuv.shape[ : 2]
+    nv = np.empty( ( height * 3 // 2, width), dtype = np.uint8)
+    nv[ : height] = yuv[ :, :, 0]
+    if vu_order :
+        interleave_chroma( yuv[ :, :, 2], yuv[ :, :, 1], nv[ height :])
+    else :
+        interleave_chroma( yuv[ :, :, 1], yuv[ :, :, 2], nv[ height :])
+    return nv
+
+def yuv2planar( yuv, vu_order) :
+    # i420/yv12 as ( height * 3 / 2, width), the way opencv lays them out too:
+    height, width = yuv.shape[ : 2]
+    planar = np.empty( ( height * 3 // 2, width), dtype = np.uint8)
+    planar[ : height] = yuv[ :, :, 0]
+    chroma = planar[ height :].reshape( 2, height // 2, width // 2)
+    first, second = ( 2, 1) if vu_order else ( 1, 2)
+    chroma[ 0] = box_average_2x2( yuv[ :, :, first])
+    chroma[ 1] = box_average_2x2( yuv[ :, :, second])
+    return planar
+
+def pair_average( plane) :
+    # mean of each horizontal pair, truncated like box_average_2x2():
+    pairs = plane[ :, : plane.shape[ 1] // 2 * 2].reshape( plane.shape[ 0], -1, 2)
+    return ( pairs.sum( axis = 2, dtype = np.uint16) >> 1).astype( np.uint8)
+
+def yuv2packed422( yuv, uyvy_order) :
+    # yuyv/uyvy as ( height, width * 2), a u and a v byte for each pair of pixels:
+    height, width = yuv.shape[ : 2]
+    packed = np.empty( ( height, width * 2), dtype = np.uint8)
+    luma = 1 if uyvy_order else 0
+    packed[ :, luma::2] = yuv[ :, :, 0]
+    packed[ :, 1 - luma::4] = pair_average( yuv[ :, :, 1])
+    packed[ :, 3 - luma::4] = pair_average( yuv[ :, :, 2])
+    return packed
+
+def default_suffix( output_type) :
+    if output_type in [ "jpg", "png", "bmp", "csv", "nv21", "nv12", "i420", "yv12", "yuyv", "uyvy"] :
+        return "." + output_type
+    elif output_type.startswith( "yuv") or output_type.startswith( "uyv") or output_type.startswith( "vyu") :
+        return ".yuv"
+    return ".bin"
 
 def prepare_save( info, args) :
     path = args.path if args.path else "."
     if os.path.isdir( path) :
         if args.suffix is not None:
             info[ "output"] = path + "/" + info[ "filename"] + args.suffix
-        elif args.output_type == "jpg" :
-            info[ "output"] = path + "/" + info[ "filename"] + ".jpg"
-        elif args.output_type == "png" :
-            info[ "output"] = path + "/" + info[ "filename"] + ".png"
-        elif args.output_type == "bmp" :
-            info[ "output"] = path + "/" + info[ "filename"] + ".bmp"
-        elif args.output_type == "csv" :
-            info[ "output"] = path + "/" + info[ "filename"] + ".csv"
-        elif args.output_type == "nv21" :
-            info[ "output"] = path + "/" + info[ "filename"] + ".nv21"
-        elif args.output_type == "nv12" :
-            info[ "output"] = path + "/" + info[ "filename"] + ".nv12"
-        elif args.output_type.startswith( "yuv") or args.output_type.startswith( "uyv") or args.output_type.startswith( "vyu") :
-            info[ "output"] = path + "/" + info[ "filename"] + ".yuv"
         else :
-            info[ "output"] = path + "/" + info[ "filename"] + ".bin"
+            info[ "output"] = path + "/" + info[ "filename"] + default_suffix( args.output_type)
     else :
         info[ "output"] = path
         folder = os.path.dirname( path)
@@ -355,36 +664,178 @@ def prepare_save( info, args) :
                 os.makedirs( folder)
             except:
                 pass
+    if info.get( "frame") is not None and not args.concat and os.path.abspath( info[ "output"]) != '/dev/stdout' :
+        # number each frame of a multi-frame input:
+        root, ext = os.path.splitext( info[ "output"])
+        info[ "output"] = root + "_%04d" % info[ "frame"] + ext
 
-def encode_image( path, ext, mat) :
+def encode_image( ext, mat, info) :
     # use imencode() instead of imwrite() to avoid failure of opencv with non-ascii path:
     ret, data = cv.imencode( ext, mat)
     if not ret :
-        print( "Warning: fail to encode '" + path + "'.", file = sys.stderr)
-        return
-    # data.tofile( path)
-    mat_2_file_or_stdout( data, path)
+        print( "Warning: fail to encode '" + info[ "output"] + "'.", file = sys.stderr)
+        return None
+    return data
 
-def save_csv( mat, info) :
-    height = info[ "height"]
-    width = info[ "width"]
-    ch = info[ "channel"]
+# pixels as jpg/png/bmp store them, float rounds and saturates the way opencv would:
+def image_mat( mat, info, args) :
+    unit = level_unit( mat, info)
+    if unit is not None :
+        if args.output_type == "png" and info[ "origin_dtype"] == np.uint16 :
+            return rescale( mat, unit, 256, np.uint16)
+        return rescale( mat, unit, 1, np.uint8)
+    if args.output_type == "png" and info[ "origin_dtype"] == np.uint16 :
+        return np.round( ( mat * 256)).astype( np.uint16)
+    return np.clip( np.rint( mat), 0, 255).astype( np.uint8)
+
+def open_output( info) :
+    # seekable output, appending keeps what is in the file already:
+    if info.get( "append", False) and os.path.exists( info[ "output"]) :
+        out = open( info[ "output"], "r+b")
+        out.seek( 0, os.SEEK_END)
+        return out
+    return open( info[ "output"], "wb")
+
+class Yuv420StripWriter( object) :
+    # y and chroma planes of a strip go to separate places of the file, nv has one chroma plane, i420/yv12 two:
+    def __init__( self, info, chroma_planes) :
+        self.out = open_output( info)
+        self.base = self.out.tell()
+        self.width = int( info[ "width"])
+        self.height = int( info[ "height"])
+        self.chroma_planes = chroma_planes
+
+    def write( self, data, top) :
+        rows = data.shape[ 0] * 2 // 3
+        self.out.seek( self.base + top * self.width)
+        data[ : rows].tofile( self.out)
+        chroma = data[ rows :].reshape( self.chroma_planes, -1)
+        plane_width = self.width // self.chroma_planes
+        for idx in range( self.chroma_planes) :
+            plane_start = self.height * self.width + idx * ( self.height // 2) * plane_width
+            self.out.seek( self.base + plane_start + top // 2 * plane_width)
+            chroma[ idx].tofile( self.out)
+
+    def close( self) :
+        self.out.close()
+
+class BmpStripWriter( object) :
+    # bmp keeps rows bottom-up, so each strip is written reversed at its place from the end:
+    def __init__( self, info, channel) :
+        self.out = open_output( info)
+        self.base = self.out.tell()
+        self.width = int( info[ "width"])
+        self.height = int( info[ "height"])
+        self.channel = channel
+        self.row_bytes = ( self.width * channel + 3) // 4 * 4
+        palette = b""
+        if channel == 1 :
+            palette = np.repeat( np.arange( 256, dtype = np.uint8), 4).reshape( 256, 4)
+            palette[ :, 3] = 0
+            palette = palette.tobytes()
+        # same headers opencv writes, 32-bit ones need bit fields to carry alpha:
+        header = struct.pack( "<iiHHIIiiII", self.width, self.height, 1, channel * 8, 3 if channel == 4 else 0, 0, 0, 0, 0, 0)
+        if channel == 4 :
+            header += struct.pack( "<IIII4s", 0x00ff0000, 0x0000ff00, 0x000000ff, 0xff000000, b"BGRs") + bytes( 64)
+        header = struct.pack( "<I", 4 + len( header)) + header
+        self.offset = 14 + len( header) + len( palette)
+        size = self.offset + self.row_bytes * self.height
+        self.out.write( struct.pack( "<2sIHHI", b"BM", size, 0, 0, self.offset))
+        self.out.write( header)
+        self.out.write( palette)
+
+    def write( self, data, top) :
+        rows = data.shape[ 0]
+        block = np.zeros( ( rows, self.row_bytes), dtype = np.uint8)
+        block[ :, : self.width * self.channel] = data[ : : -1].reshape( rows, -1)
+        self.out.seek( self.base + self.offset + ( self.height - top - rows) * self.row_bytes)
+        block.tofile( self.out)
+
+    def close( self) :
+        self.out.close()
+
+class PngStripWriter( object) :
+    # png rows are one zlib stream, so strips can be compressed as they come:
+    def __init__( self, info, channel, dtype) :
+        if os.path.abspath( info[ "output"]) == '/dev/stdout' :
+            self.out = os.fdopen( sys.stdout.fileno(), 'wb', closefd = False)
+        else :
+            self.out = open( info[ "output"], "ab" if info.get( "append", False) else "wb")
+        self.channel = channel
+        self.depth = 16 if dtype == np.uint16 else 8
+        self.compressor = zlib.compressobj( 1)
+        color_type = { 1 : 0, 3 : 2, 4 : 6}[ channel]
+        self.out.write( b"\x89PNG\r\n\x1a\n")
+        self.chunk( b"IHDR", struct.pack( ">IIBBBBB", int( info[ "width"]), int( info[ "height"]), self.depth, color_type, 0, 0, 0))
+
+    def chunk( self, kind, data) :
+        self.out.write( struct.pack( ">I", len( data)) + kind + data)
+        self.out.write( struct.pack( ">I", zlib.crc32( kind + data) & 0xffffffff))
+
+    def write( self, data, top) :
+        if self.channel >= 3 :
+            data = data[ :, :, [ 2, 1, 0, 3][ : self.channel]]
+        if self.depth == 16 :
+            data = data.astype( ">u2")
+        rows = np.ascontiguousarray( data).reshape( data.shape[ 0], -1).view( np.uint8)
+        # "sub" filter, each byte minus the same byte of the pixel on its left:
+        pixel_bytes = self.channel * self.depth // 8
+        filtered = np.empty( ( rows.shape[ 0], rows.shape[ 1] + 1), dtype = np.uint8)
+        filtered[ :, 0] = 1
+        filtered[ :, 1 : 1 + pixel_bytes] = rows[ :, : pixel_bytes]
+        np.subtract( rows[ :, pixel_bytes :], rows[ :, : -pixel_bytes], out = filtered[ :, 1 + pixel_bytes :])
+        compressed = self.compressor.compress( filtered.tobytes())
+        if len( compressed) > 0 :
+            self.chunk( b"IDAT", compressed)
+
+    def close( self) :
+        self.chunk( b"IDAT", self.compressor.flush())
+        self.chunk( b"IEND", b"")
+        self.out.close()
+
+def write_csv( mat, out, block_rows = 256) :
+    height, width = mat.shape[ : 2]
+    ch = mat.shape[ 2] if mat.ndim > 2 else 1
+    integral = np.issubdtype( mat.dtype, np.integer)
+    # one printf-style template per row, multi-channel pixels are quoted tuples:
+    value = "%d" if integral else "%s"
+    if ch > 1 :
+        cell = '"(' + ", ".join( [ value] * ch) + ')"'
+    else :
+        cell = value
+    row_format = ",".join( [ cell] * width) + "\n"
+    for top in range( 0, height, block_rows) :
+        block = mat[ top : top + block_rows]
+        if not integral :
+            # astype( str) formats each value the same way str() does:
+            block = block.astype( str)
+        rows = block.reshape( -1, width * ch).tolist()
+        out.write( "".join( [ row_format % tuple( row) for row in rows]))
+
+def csv_values( mat, info) :
+    unit = level_unit( mat, info)
+    if unit is not None :
+        if info[ "origin_dtype"] == np.uint8:
+            return rescale( mat, unit, 1, np.uint8)
+        elif info[ "origin_dtype"] == np.uint16:
+            return rescale( mat, unit, 256, np.uint16)
+        # u32 is listed as 0~255 levels:
+        return mat.astype( np.float32) / float( unit)
     if info[ "origin_dtype"] == np.uint8:
-        mat = np.round( mat).astype( np.uint8)
+        return np.round( mat).astype( np.uint8)
     elif info[ "origin_dtype"] == np.uint16:
-        mat = np.round( mat * 256).astype( np.uint16)
+        return np.round( mat * 256).astype( np.uint16)
     elif info[ "origin_dtype"] == np.float32:
-        mat /= 255.0
-    with open( info[ "output"], "w") as out:
-        for i in range( height):
-            for j in range( width):
-                if j > 0:
-                    out.write( ",")
-                if ch > 1:
-                    out.write( '"' + str( tuple( mat[ i, j])) + '"')
-                else:
-                    out.write( str( mat[ i, j]))
-            out.write( "\n")
+        return mat / 255.0
+    return mat
+
+def save_csv( mat, info) :
+    if os.path.abspath( info[ "output"]) == '/dev/stdout':
+        write_csv( mat, sys.stdout)
+        sys.stdout.flush()
+    else:
+        with open( info[ "output"], "a" if info.get( "append", False) else "w") as out:
+            write_csv( mat, out)
 
 def is_same_path( path1, path2):
     try:
@@ -392,13 +843,39 @@ def is_same_path( path1, path2):
     except:
         return False
 
-# mat is single-channel-float32(0~255) or BGR or BGRA:
-def save_mat( mat, info, args) :
-    if os.path.exists( info[ "output"]) and not args.force and not is_same_path( info[ "output"], '/dev/stdout') :
+def ready_to_save( info, args) :
+    if not info.get( "append", False) and os.path.exists( info[ "output"]) and not args.force and not is_same_path( info[ "output"], '/dev/stdout') :
         if not prompt( "File '" + info[ "output"] + "' already exists, overwrite?", True) :
-            return
+            return False
     if args.verbose :
         verbose( info)
+    return True
+
+def shared_gray( mat, info, shared) :
+    # intermediates go into shared, so outputs of one decoded image compute each at most once:
+    if info[ "channel"] == 1 :
+        return mat
+    if "gray" not in shared :
+        shared[ "gray"] = cv.cvtColor( mat, cv.COLOR_BGR2GRAY if info[ "channel"] == 3 else cv.COLOR_BGRA2GRAY)
+    return shared[ "gray"]
+
+def shared_bgr( mat, info, shared) :
+    if info[ "channel"] != 1 :
+        return mat
+    if "bgr" not in shared :
+        shared[ "bgr"] = cv.cvtColor( gray_u8( mat, info), cv.COLOR_GRAY2BGR)
+    return shared[ "bgr"]
+
+def shared_yuv( mat, info, shared, standard, fullrange) :
+    key = ( "yuv", standard, fullrange)
+    if key not in shared :
+        shared[ key] = bgr2yuv( shared_bgr( mat, info, shared), standard, fullrange)
+    return shared[ key]
+
+# mat is single-channel-float32(0~255) or BGR or BGRA, returns data of output type or None:
+def encode_mat( mat, info, args, shared = None) :
+    if shared is None :
+        shared = {}
     yuv_cs = "bt601"
     if args.output_yuv_color :
         yuv_cs = args.output_yuv_color
@@ -406,112 +883,143 @@ def save_mat( mat, info, args) :
     if args.output_yuv_range and not args.output_yuv_range.startswith( "full") :
         yuv_fullrange = False
     if args.output_type == "jpg" :
-        encode_image( info[ "output"], ".jpg", mat)
+        return encode_image( ".jpg", image_mat( mat, info, args), info)
     elif args.output_type == "png" :
-        if np.issubdtype( mat.dtype, np.floating) and info[ "origin_dtype"] == np.uint16:
-            encode_image( info[ "output"], ".png", np.round( ( mat * 256)).astype( np.uint16))
-        else:
-            encode_image( info[ "output"], ".png", mat)
+        return encode_image( ".png", image_mat( mat, info, args), info)
     elif args.output_type == "bmp" :
-        encode_image( info[ "output"], ".bmp", mat)
+        return encode_image( ".bmp", image_mat( mat, info, args), info)
     elif args.output_type == 'csv' :
-        save_csv( mat, info)
+        return csv_values( mat, info)
     elif args.output_type == "u8" :
-        if info[ "channel"] == 3 :
-            mat = cv.cvtColor( mat, cv.COLOR_BGR2GRAY)
-        elif info[ "channel"] == 4 :
-            mat = cv.cvtColor( mat, cv.COLOR_BGRA2GRAY)
-        else :
-            mat = np.uint8( np.rint( mat))
-        # mat.tofile( info[ "output"])
-        mat_2_file_or_stdout( mat, info[ "output"])
+        return gray_u8( shared_gray( mat, info, shared), info)
     elif args.output_type == "u16" :
-        if info[ "channel"] == 3 :
-            mat = cv.cvtColor( mat, cv.COLOR_BGR2GRAY)
-        elif info[ "channel"] == 4 :
-            mat = cv.cvtColor( mat, cv.COLOR_BGRA2GRAY)
+        mat = shared_gray( mat, info, shared)
+        unit = level_unit( mat, info)
+        if unit is not None :
+            return rescale( mat, unit, 256, np.uint16)
         mat = np.uint16( np.rint( mat * 256))
-        # mat.tofile( info[ "output"])
-        mat_2_file_or_stdout( mat, info[ "output"])
+        return mat
+    elif args.output_type in RAW_PACKINGS :
+        mat = shared_gray( mat, info, shared)
+        unit = level_unit( mat, info)
+        # 0~255 scaled up to 10 or 12 bits:
+        scale = 4 if args.output_type == "raw10" else 16
+        if unit is not None :
+            mat = np.minimum( rescale( mat, unit, scale, np.uint16), 255 * scale + scale - 1)
+        else :
+            mat = np.uint16( np.clip( np.rint( mat * float( scale)), 0, 255 * scale + scale - 1))
+        return pack_raw( mat, args.output_type)
     elif args.output_type == "u32":
-        if info[ "channel"] == 3 :
-            mat = cv.cvtColor( mat, cv.COLOR_BGR2GRAY)
-        elif info[ "channel"] == 4 :
-            mat = cv.cvtColor( mat, cv.COLOR_BGRA2GRAY)
+        mat = shared_gray( mat, info, shared)
+        unit = level_unit( mat, info)
+        if unit is not None :
+            return rescale( mat, unit, 16843009, np.uint32)
         mat = np.uint32( np.rint( mat * 16843009))
-        # mat.tofile( info[ "output"])
-        mat_2_file_or_stdout( mat, info[ "output"])
+        return mat
     elif args.output_type == "f32" :
-        if info[ "channel"] == 3 :
-            mat = cv.cvtColor( mat, cv.COLOR_BGR2GRAY)
-        elif info[ "channel"] == 4 :
-            mat = cv.cvtColor( mat, cv.COLOR_BGRA2GRAY)
+        mat = shared_gray( mat, info, shared)
+        unit = level_unit( mat, info)
+        if unit is not None :
+            return mat.astype( np.float32) / float( unit) / 255.0
         mat = mat.astype( np.float32) / 255.0
-        # mat.tofile( info[ "output"])
-        mat_2_file_or_stdout( mat, info[ "output"])
+        return mat
     elif args.output_type == "bgr" :
-        if info[ "channel"] == 1 :
-            mat = np.uint8( np.rint( mat))
-            mat = cv.cvtColor( mat, cv.COLOR_GRAY2BGR)
-        elif info[ "channel"] == 4 :
-            mat = mat[ :, :, :3]
-        # mat.tofile( info[ "output"])
-        mat_2_file_or_stdout( mat, info[ "output"])
+        if info[ "channel"] == 4 :
+            return mat[ :, :, :3]
+        return shared_bgr( mat, info, shared)
     elif args.output_type == "rgb" :
-        if info[ "channel"] == 1 :
-            mat = np.uint8( np.rint( mat))
-            mat = cv.cvtColor( mat, cv.COLOR_GRAY2BGR)
-        elif info[ "channel"] == 4 :
+        if info[ "channel"] == 4 :
             mat = mat[ :, :, :3]
-        mat = cv.cvtColor( mat, cv.COLOR_BGR2RGB)
-        # mat.tofile( info[ "output"])
-        mat_2_file_or_stdout( mat, info[ "output"])
+        mat = cv.cvtColor( shared_bgr( mat, info, shared), cv.COLOR_BGR2RGB)
+        return mat
     elif args.output_type == "rgba" :
         if info[ "channel"] == 1 :
-            mat = np.uint8( np.rint( mat))
-            mat = cv.cvtColor( mat, cv.COLOR_GRAY2BGRA)
+            mat = cv.cvtColor( gray_u8( mat, info), cv.COLOR_GRAY2BGRA)
         elif info[ "channel"] == 3 :
             mat = cv.cvtColor( mat, cv.COLOR_BGR2BGRA)
         mat = cv.cvtColor( mat, cv.COLOR_BGRA2RGBA)
-        # mat.tofile( info[ "output"])
-        mat_2_file_or_stdout( mat, info[ "output"])
+        return mat
     elif args.output_type == "bgra" :
         if info[ "channel"] == 1 :
-            mat = np.uint8( np.rint( mat))
-            mat = cv.cvtColor( mat, cv.COLOR_GRAY2BGRA)
+            mat = cv.cvtColor( gray_u8( mat, info), cv.COLOR_GRAY2BGRA)
         elif info[ "channel"] == 3 :
             mat = cv.cvtColor( mat, cv.COLOR_BGR2BGRA)
-        # mat.tofile( info[ "output"])
-        mat_2_file_or_stdout( mat, info[ "output"])
+        return mat
     elif args.output_type == "yuv" :
-        if info[ "channel"] == 1 :
-            mat = np.uint8( np.rint( mat))
-            mat = cv.cvtColor( mat, cv.COLOR_GRAY2BGR)
-        save_bgr2yuv( mat, yuv_cs, yuv_fullrange, info)
-    elif args.output_type == "nv21" :
+        return shared_yuv( mat, info, shared, yuv_cs, yuv_fullrange)
+    elif args.output_type in YUV420_TYPES :
         h = info[ "height"]
         w = info[ "width"]
         if h % 2 != 0 or w % 2 != 0 :
-            print( "Error: cannot save nv21 image with height = " + str( h) + " and width = " + str( w), file = sys.stderr)
-            return
-        if info[ "channel"] == 1 :
-            mat = np.uint8( np.rint( mat))
-            mat = cv.cvtColor( mat, cv.COLOR_GRAY2BGR)
-        save_bgr2nv21( mat, yuv_cs, yuv_fullrange, info)
-    elif args.output_type == "nv12" :
-        h = info[ "height"]
+            print( "Error: cannot save " + args.output_type + " image with height = " + str( h) + " and width = " + str( w), file = sys.stderr)
+            return None
+        yuv = shared_yuv( mat, info, shared, yuv_cs, yuv_fullrange)
+        if args.output_type.startswith( "nv") :
+            return yuv2nv( yuv, args.output_type == "nv21")
+        return yuv2planar( yuv, args.output_type == "yv12")
+    elif args.output_type in YUV422_TYPES :
         w = info[ "width"]
-        if h % 2 != 0 or w % 2 != 0 :
-            print( "Error: cannot save nv12 image with height = " + str( h) + " and width = " + str( w), file = sys.stderr)
-            return
-        if info[ "channel"] == 1 :
-            mat = np.uint8( np.rint( mat))
-            mat = cv.cvtColor( mat, cv.COLOR_GRAY2BGR)
-        save_bgr2nv12( mat, yuv_cs, yuv_fullrange, info)
+        if w % 2 != 0 :
+            print( "Error: cannot save " + args.output_type + " image with width = " + str( w), file = sys.stderr)
+            return None
+        return yuv2packed422( shared_yuv( mat, info, shared, yuv_cs, yuv_fullrange), args.output_type == "uyvy")
+    print( "ERROR: internal error encode_mat()", file = sys.stderr)
+    exit( 1)
 
+def write_output( data, info, args) :
+    if args.output_type == "csv" :
+        save_csv( data, info)
+    elif getattr( args, "writer", None) is not None and os.path.abspath( info[ "output"]) != '/dev/stdout' :
+        args.writer.put( data, info[ "output"], info.get( "append", False))
+    else :
+        # data.tofile( info[ "output"])
+        mat_2_file_or_stdout( data, info[ "output"], info.get( "append", False))
 
-def process_image( mat, filename, args) :
-    info = {}
+def wait_output( args) :
+    # for writes that must not overtake queued ones to the same file:
+    if getattr( args, "writer", None) is not None :
+        args.writer.wait()
+
+def save_mat( mat, info, args, shared = None) :
+    if not ready_to_save( info, args) :
+        return True
+    data = encode_mat( mat, info, args, shared)
+    if data is None :
+        return False
+    write_output( data, info, args)
+    return True
+
+def output_args( args) :
+    # one copy of args for each output type given to -o, the decoded image fans out to all of them:
+    if len( args.output_types) <= 1 :
+        return [ args]
+    suffixes = [ default_suffix( output_type) for output_type in args.output_types]
+    result = []
+    for output_type, suffix in zip( args.output_types, suffixes) :
+        out_args = copy.copy( args)
+        out_args.output_type = output_type
+        out_args.output_types = [ output_type]
+        if suffixes.count( suffix) > 1 :
+            # types sharing .bin or .yuv would overwrite each other, name those after the type:
+            out_args.suffix = "." + output_type
+        result.append( out_args)
+    return result
+
+def output_info( info, args) :
+    out_info = dict( info)
+    prepare_save( out_info, args)
+    return out_info
+
+def save_outputs( mat, info, args) :
+    result = True
+    shared = {}
+    for out_args in output_args( args) :
+        if not save_mat( mat, output_info( info, out_args), out_args, shared) :
+            result = False
+    return result
+
+# fills info from a decoded image and returns what encode_mat() takes:
+def decode_image( mat, info, args) :
     info[ "origin_dtype"] = mat.dtype
     info[ "height"] = int( mat.shape[ 0])
     info[ "width"] = int( mat.shape[ 1])
@@ -519,23 +1027,25 @@ def process_image( mat, filename, args) :
         info[ "channel"] = int( mat.shape[ 2])
     except :
         info[ "channel"] = 1
-    info[ "filename"] = os.path.basename( filename)
     info[ "stride"] = 0
     info[ "scanline"] = 0
     if info[ "channel"] == 1 :
         info[ "y_range"] = "[" + str( mat.min()) + "," + str( mat.max()) + "]"
-        prepare_save( info, args)
         if args.normalize is not None:
             if args.normalize > 0:
                 norm_max = args.normalize
             else:
                 norm_max = mat.max()
             mat = mat.astype( np.float32) * 255 / norm_max
-        elif mat.dtype == np.uint16:
-            mat = mat.astype( np.float) / 256
+            # float input is listed at double precision, as it always was:
+            return mat.astype( np.float64) if np.issubdtype( info[ "origin_dtype"], np.floating) else mat
+        elif mat.dtype in [ np.uint8, np.uint16] :
+            # kept as is, encode_mat() scales integers to the output type directly:
+            info[ "unit"] = 1 if mat.dtype == np.uint8 else 256
+            return mat
         elif mat.dtype == np.float32:
-            mat = mat * 255
-        save_mat( mat.astype( np.float), info, args)
+            return ( mat * 255).astype( np.float64)
+        return mat.astype( np.float64)
     elif info[ "channel"] == 2:
         if args.normalize is not None :
             print( "Warning: option -n/--normalize only works with 1-channel input, ignored.", file = sys.stderr)
@@ -552,9 +1062,8 @@ def process_image( mat, filename, args) :
             y = mat[ :, :, 0]
             a = mat[ :, :, 1]
         bgra = cv.merge( ( y, y, y, a))
-        prepare_save( info, args)
         info[ "origin_dtype"] = np.uint8
-        save_mat( bgra.astype( np.uint8), info, args)
+        return bgra.astype( np.uint8)
     elif info[ "channel"] >= 3:
         if args.normalize is not None :
             print( "Warning: option -n/--normalize only works with 1-channel input, ignored.", file = sys.stderr)
@@ -571,18 +1080,29 @@ def process_image( mat, filename, args) :
             mat = ( mat / 256).astype( np.uint8)
         elif mat.dtype == np.float32:
             mat = ( mat * 255).astype( np.uint8)
-        prepare_save( info, args)
         info[ "origin_dtype"] = np.uint8
-        save_mat( mat, info, args)
+        return mat
     else:
-        print( "ERROR: internal error process_image()", file = sys.stderr)
+        print( "ERROR: internal error decode_image()", file = sys.stderr)
         exit( 1)
 
+def process_image( mat, filename, args) :
+    info = {}
+    info[ "filename"] = os.path.basename( filename)
+    region = image_region( mat)
+    if not roi_or_exit( region, args) :
+        print( "Warning: crop region is outside of input file '" + filename + "'", file = sys.stderr)
+        return False
+    mat = decode_image( crop_region( mat, region), info, args)
+    return save_outputs( mat, info, args)
+
 def get_size( array, info, args) :
     # get stride and scanline:
     size = len( array)
-    if args.input_type.startswith( "nv") :
+    if args.input_type in YUV420_TYPES :
         size = size * 2 // 3
+    if size <= 0 :
+        return False
     if args.stride != None and args.stride > 0 :
         info[ "stride"] = args.stride
         if not args.scanline or args.scanline <= 0 :
@@ -595,7 +1115,7 @@ def get_size( array, info, args) :
     else :
         info[ "scanline"] = 0
         info[ "stride"] = 0
-    if args.input_type.startswith( "nv") :
+    if args.input_type in YUV420_TYPES :
         if args.scanline and args.scanline % 2 != 0 :
             return False
         elif args.row and args.row % 2 != 0 :
@@ -604,6 +1124,12 @@ def get_size( array, info, args) :
             return False
         if info[ "scanline"] % 2 != 0 :
             return False
+        # i420/yv12 chroma rows are half the stride:
+        if not args.input_type.startswith( "nv") and info[ "stride"] % 2 != 0 :
+            return False
+    elif args.input_type in YUV422_TYPES :
+        if args.col and args.col % 2 != 0 :
+            return False
     # get width and height:
     if args.row != None and args.row > 0 :
         info[ "height"] = int( args.row)
@@ -611,48 +1137,182 @@ def get_size( array, info, args) :
             info[ "width"] = int( args.col)
         else :
             if info[ "stride"] > 0 :
-                info[ "width"] = info[ "stride"] // info[ "pixel_bytes"]
+                info[ "width"] = row_pixels( info[ "stride"], info)
             else :
-                info[ "width"] = size // info[ "pixel_bytes"] // info[ "height"]
+                info[ "width"] = row_pixels( size // info[ "height"], info)
     elif args.col != None and args.col > 0 :
         info[ "width"] = int( args.col)
         if info[ "scanline"] > 0 :
             info[ "height"] = info[ "scanline"]
         else :
-            info[ "height"] = size // info[ "pixel_bytes"] // info[ "width"]
+            info[ "height"] = size // row_bytes( info[ "width"], info)
     elif info[ "stride"] > 0 and info[ "scanline"] > 0 :
         info[ "height"] = info[ "scanline"]
-        info[ "width"] = info[ "stride"] // info[ "pixel_bytes"]
+        info[ "width"] = row_pixels( info[ "stride"], info)
     else :
-        info[ "width"] = guess_width( array, info[ "pixel_bytes"], args)
-        info[ "height"] = size // info[ "pixel_bytes"] // info[ "width"]
+        if "packing" in info :
+            # a packed row repeats every stride bytes, so guess that on the bytes:
+            info[ "width"] = row_pixels( resolve_width( array, 1, args), info)
+        else :
+            info[ "width"] = resolve_width( array, info[ "pixel_bytes"], args)
+        if info[ "width"] <= 0 :
+            return False
+        info[ "height"] = size // row_bytes( info[ "width"], info)
+    if info[ "width"] <= 0 or info[ "height"] <= 0 :
+        return False
+    if args.input_type in YUV422_TYPES and info[ "width"] % 2 != 0 :
+        return False
     if info[ "stride"] <= 0 :
-        info[ "stride"] = info[ "width"] * info[ "pixel_bytes"]
+        info[ "stride"] = row_bytes( info[ "width"], info)
     if info[ "scanline"] <= 0 :
         info[ "scanline"] = info[ "height"]
     # check if stride is large enough for width:
-    if info[ "width"] * info[ "pixel_bytes"] > info[ "stride"] :
+    if row_bytes( info[ "width"], info) > info[ "stride"] :
         return False
     # check if scanline is large enough for height:
     if info[ "scanline"] < info[ "height"] :
         return False
     # check if enough data for stride and scanline:
-    if args.input_type.startswith( "nv") :
+    if args.input_type in YUV420_TYPES :
         expected_size = info[ "stride"] * info[ "scanline"] * 3 / 2
     else :
         expected_size = info[ "stride"] * info[ "scanline"]
     return len( array) >= expected_size
 
 
-def process_raw( array, filename, args) :
-    yuv_cs = "bt601"
-    if args.input_yuv_color :
-        yuv_cs = args.input_yuv_color
-    yuv_fullrange = True
-    if args.input_yuv_range and not args.input_yuv_range.startswith( "full") :
-        yuv_fullrange = False
+def transcode_nv_swap( array, info, args) :
+    return yuv_frame( yuv_planes( array, info, args), args.output_type)
+
+def nv_chroma( uv, vu_order) :
+    if vu_order :
+        return uv[ :, 1::2], uv[ :, 0::2]
+    return uv[ :, 0::2], uv[ :, 1::2]
+
+def yuv_planes( array, info, args) :
+    # y, u and v as strided views of the input region, frame is the layout opencv decodes when the input has it as is:
+    stride = int( info[ "stride"])
+    scanline = int( info[ "scanline"])
+    x0, y0, step, w, h = raw_region( info)
+    out_w = int( info[ "width"])
+    out_h = int( info[ "height"])
+    if args.input_type in YUV422_TYPES :
+        rows = array[ : stride * scanline].reshape( scanline, stride)[ : h, : w * 2]
+        luma = 1 if args.input_type == "uyvy" else 0
+        frame = None
+        if step == 1 :
+            frame = rows[ y0 : y0 + out_h, x0 * 2 : ( x0 + out_w) * 2].reshape( out_h, out_w, 2)
+        return { "y" : pick( rows[ :, luma::2], y0, x0, step, out_h, out_w),
+                 "u" : pick( rows[ :, 1 - luma::4], y0, x0 // 2, step, out_h, out_w // 2),
+                 "v" : pick( rows[ :, 3 - luma::4], y0, x0 // 2, step, out_h, out_w // 2),
+                 "frame" : frame}
+    y = array[ : stride * scanline].reshape( scanline, stride)[ : h, : w]
+    chroma = array[ stride * scanline : stride * scanline * 3 // 2]
+    if args.input_type.startswith( "nv") :
+        uv = chroma.reshape( scanline // 2, stride)[ : h // 2, : w]
+        u, v = nv_chroma( uv, args.input_type == "nv21")
+    else :
+        # i420/yv12 chroma planes are half as wide and have half the stride:
+        first, second = chroma.reshape( 2, scanline // 2, stride // 2)[ :, : h // 2, : w // 2]
+        u, v = ( second, first) if args.input_type == "yv12" else ( first, second)
+    frame = None
+    if stride == w and scanline == h and "roi" not in info :
+        frame = array[ : w * h * 3 // 2].reshape( h * 3 // 2, w)
+    # chroma rows and columns are picked with the same step, so each stays with the top left pixel of its block:
+    return { "y" : pick( y, y0, x0, step, out_h, out_w),
+             "u" : pick( u, y0 // 2, x0 // 2, step, out_h // 2, out_w // 2),
+             "v" : pick( v, y0 // 2, x0 // 2, step, out_h // 2, out_w // 2),
+             "frame" : frame}
+
+def yuv_frame( planes, input_type) :
+    # copy the planes into the layout opencv decodes:
+    y = planes[ "y"]
+    h, w = y.shape
+    if input_type in YUV422_TYPES :
+        luma = 1 if input_type == "uyvy" else 0
+        frame = np.empty( ( h, w, 2), dtype = np.uint8)
+        frame[ :, :, luma] = y
+        frame[ :, 0::2, 1 - luma] = planes[ "u"]
+        frame[ :, 1::2, 1 - luma] = planes[ "v"]
+        return frame
+    frame = np.empty( ( h * 3 // 2, w), dtype = np.uint8)
+    frame[ : h] = y
+    first, second = ( planes[ "v"], planes[ "u"]) if input_type in [ "nv21", "yv12"] else ( planes[ "u"], planes[ "v"])
+    if input_type.startswith( "nv") :
+        frame[ h :, 0::2] = first
+        frame[ h :, 1::2] = second
+    else :
+        chroma = frame[ h :].reshape( 2, h // 2, w // 2)
+        chroma[ 0] = first
+        chroma[ 1] = second
+    return frame
+
+def upsample_chroma( y, u, v) :
+    h, w = y.shape
+    # 2 for subsampled directions, 1 for the others:
+    fy = h // u.shape[ 0]
+    fx = w // u.shape[ 1]
+    yuv = np.empty( ( h, w, 3), dtype = np.uint8)
+    yuv[ :, :, 0] = y
+    # view each chroma channel as blocks and broadcast the subsampled value into them:
+    yuv[ :, :, 1].reshape( h // fy, fy, w // fx, fx)[ ...] = u[ :, None, :, None]
+    yuv[ :, :, 2].reshape( h // fy, fy, w // fx, fx)[ ...] = v[ :, None, :, None]
+    return yuv
+
+def transcode_subsampled2yuv( array, info, args) :
+    planes = yuv_planes( array, info, args)
+    return upsample_chroma( planes[ "y"], planes[ "u"], planes[ "v"])
+
+def subsampled2bgr( planes, input_type, standard, fullrange, in_range) :
+    if standard == "bt601" and not fullrange and in_range :
+        # opencv implements exactly this one, without clamping, so only legal data may go there:
+        frame = planes[ "frame"]
+        if frame is None :
+            frame = yuv_frame( planes, input_type)
+        return cv.cvtColor( frame, getattr( cv, YUV2BGR_CODES[ input_type]))
+    return yuv_transform( upsample_chroma( planes[ "y"], planes[ "u"], planes[ "v"]), standard, fullrange)
+
+def transcode_swap_rb( array, info, args) :
+    ch = info[ "channel"]
+    return raw_planes( array, info, args)[ :, :, [ 2, 1, 0, 3][ : ch]]
+
+def transcode_u16_to_u8( array, info, args) :
+    # rounds and saturates like the decoding path, in integers as well:
+    return rescale( raw_planes( array, info, args), 256, 1, np.uint8)
+
+# ( input type, output type) pairs converted without decoding to BGR:
+RAW_TRANSCODERS = {
+    ( "nv21", "nv12") : transcode_nv_swap,
+    ( "nv12", "nv21") : transcode_nv_swap,
+    ( "nv21", "yuv") : transcode_subsampled2yuv,
+    ( "nv12", "yuv") : transcode_subsampled2yuv,
+    ( "i420", "yuv") : transcode_subsampled2yuv,
+    ( "yv12", "yuv") : transcode_subsampled2yuv,
+    ( "yuyv", "yuv") : transcode_subsampled2yuv,
+    ( "uyvy", "yuv") : transcode_subsampled2yuv,
+    ( "rgb", "bgr") : transcode_swap_rb,
+    ( "bgr", "rgb") : transcode_swap_rb,
+    ( "rgba", "bgra") : transcode_swap_rb,
+    ( "bgra", "rgba") : transcode_swap_rb,
+    ( "u16", "u8") : transcode_u16_to_u8,
+}
+
+def can_transcode( info, args) :
+    if ( args.input_type, args.output_type) not in RAW_TRANSCODERS or args.bayer :
+        return False
+    if args.input_type in YUV420_TYPES + YUV422_TYPES :
+        if ( args.input_type in YUV420_TYPES and int( info[ "height"]) % 2 != 0) or int( info[ "width"]) % 2 != 0 :
+            return False
+        # chroma bytes are only copied, so both sides must share the yuv color space:
+        in_full = not args.input_yuv_range or args.input_yuv_range.startswith( "full")
+        out_full = not args.output_yuv_range or args.output_yuv_range.startswith( "full")
+        if ( args.input_yuv_color or "bt601") != ( args.output_yuv_color or "bt601") or in_full != out_full :
+            return False
+    if args.input_type == "u16" and args.normalize is not None :
+        return False
+    return True
+
+def raw_format( args) :
     info = {}
-    info[ "filename"] = os.path.basename( filename)
     if args.input_type == "u8" :
         info[ "channel"] = 1
         info[ "pixel_bytes"] = 1
@@ -669,6 +1329,11 @@ def process_raw( array, filename, args) :
         info[ "channel"] = 1
         info[ "pixel_bytes"] = 4
         info[ "origin_dtype"] = np.float32
+    elif args.input_type in RAW_PACKINGS :
+        info[ "channel"] = 1
+        info[ "pixel_bytes"] = 1
+        info[ "packing"] = RAW_PACKINGS[ args.input_type]
+        info[ "origin_dtype"] = np.uint16
     elif args.input_type in [ "bgr", "rgb", "yuv"] :
         info[ "channel"] = 3
         info[ "pixel_bytes"] = 3
@@ -677,151 +1342,831 @@ def process_raw( array, filename, args) :
         info[ "channel"] = 4
         info[ "pixel_bytes"] = 4
         info[ "origin_dtype"] = np.uint8
-    elif args.input_type.startswith( "nv") :
+    elif args.input_type in YUV420_TYPES :
         info[ "channel"] = 3
         info[ "pixel_bytes"] = 1
         info[ "origin_dtype"] = np.uint8
+    elif args.input_type in YUV422_TYPES :
+        info[ "channel"] = 3
+        info[ "pixel_bytes"] = 2
+        info[ "origin_dtype"] = np.uint8
+    else :
+        print( "ERROR: internal error raw_format()", file = sys.stderr)
+        exit( 1)
+    if args.bayer :
+        if args.input_type not in BAYER_INPUT_TYPES :
+            print( "ERROR: option --bayer only works with u8, u16, raw10 or raw12 input", file = sys.stderr)
+            exit( 1)
+        # demosaiced into 8-bit BGR:
+        info[ "channel"] = 3
+        info[ "origin_dtype"] = np.uint8
+    elif args.input_type in RAW_UNITS and args.normalize is None :
+        info[ "unit"] = RAW_UNITS[ args.input_type]
+    return info
+
+def row_bytes( width, info) :
+    # bytes taken by width pixels, packed formats round up to whole groups:
+    if "packing" in info :
+        pixels, group = info[ "packing"]
+        return ( width + pixels - 1) // pixels * group
+    return width * info[ "pixel_bytes"]
+
+def row_pixels( size, info) :
+    if "packing" in info :
+        pixels, group = info[ "packing"]
+        return size // group * pixels
+    return size // info[ "pixel_bytes"]
+
+def parse_crop( spec) :
+    values = [ int( value) for value in spec.split( ",")]
+    if len( values) != 4 :
+        raise ValueError( spec)
+    return values
+
+def apply_roi( info, args) :
+    # narrow info sized by get_size() to the --crop region and --decimate step, returns False if nothing is left;
+    #   the region goes to info[ "roi"] as ( x, y, step, width, height), the last two of the whole image.
+    if not args.crop and args.decimate <= 1 :
+        return True
+    width = int( info[ "width"])
+    height = int( info[ "height"])
+    x, y, w, h = parse_crop( args.crop) if args.crop else ( 0, 0, width, height)
+    step = max( args.decimate, 1)
+    # keep whole 4:2:0 / 4:2:2 chroma blocks and bayer cells:
+    if args.bayer or args.input_type in YUV420_TYPES :
+        cell_x, cell_y = 2, 2
+    elif args.input_type in YUV422_TYPES :
+        cell_x, cell_y = 2, 1
+    else :
+        cell_x, cell_y = 1, 1
+    x -= x % cell_x
+    y -= y % cell_y
+    w = min( w, width - x)
+    h = min( h, height - y)
+    w -= w % cell_x
+    h -= h % cell_y
+    if x < 0 or y < 0 or w <= 0 or h <= 0 :
+        return False
+    if args.bayer :
+        out_w = ( w // 2 + step - 1) // step * 2
+        out_h = ( h // 2 + step - 1) // step * 2
     else :
-        print( "ERROR: internal error process_raw()", file = sys.stderr)
+        out_w = ( w + step - 1) // step // cell_x * cell_x
+        out_h = ( h + step - 1) // step // cell_y * cell_y
+    if out_w <= 0 or out_h <= 0 :
+        return False
+    info[ "roi"] = ( x, y, step, width, height)
+    info[ "width"] = out_w
+    info[ "height"] = out_h
+    return True
+
+def raw_region( info) :
+    if "roi" in info :
+        return info[ "roi"]
+    return 0, 0, 1, int( info[ "width"]), int( info[ "height"])
+
+def pick( plane, top, left, step, rows, cols) :
+    # rows x cols samples, every step-th one from ( top, left), as a view:
+    return plane[ top : top + ( rows - 1) * step + 1 : step, left : left + ( cols - 1) * step + 1 : step]
+
+def pick_cells( plane, top, left, step, rows, cols) :
+    # same for whole 2x2 cells of a bayer mosaic, only a decimated one needs a copy:
+    region = plane[ top : top + ( rows // 2 - 1) * step * 2 + 2, left : left + ( cols // 2 - 1) * step * 2 + 2]
+    if step == 1 :
+        return region
+    cells = region.reshape( region.shape[ 0] // 2, 2, region.shape[ 1] // 2, 2)[ ::step, :, ::step]
+    return cells.reshape( rows, cols)
+
+def roi_or_exit( info, args) :
+    try :
+        return apply_roi( info, args)
+    except ValueError :
+        print( "ERROR: invalid crop region '" + args.crop + "', expecting X,Y,W,H", file = sys.stderr)
         exit( 1)
+
+def image_region( mat) :
+    return { "width" : mat.shape[ 1], "height" : mat.shape[ 0]}
+
+def crop_region( mat, region) :
+    # decoded images take --crop and --decimate as a view too, region is sized by apply_roi():
+    x0, y0, step, w, h = raw_region( region)
+    return pick( mat, y0, x0, step, region[ "height"], region[ "width"])
+
+def frame_size( info, args) :
+    if args.input_type in YUV420_TYPES :
+        return int( info[ "stride"]) * int( info[ "scanline"]) * 3 // 2
+    return int( info[ "stride"]) * int( info[ "scanline"])
+
+def select_frames( spec, count) :
+    # python indexing, negative numbers count from the last frame:
+    if ":" in spec :
+        start, end = spec.split( ":", 1)
+        return range( count)[ int( start) if start else None : int( end) if end else None]
+    index = int( spec)
+    if index < -count or index >= count :
+        return []
+    return [ index % count]
+
+def process_frames( array, filename, args) :
+    info = raw_format( args)
     if not get_size( array, info, args) :
         print( "Warning: invalid size configuration for input file '" + filename + "'", file = sys.stderr)
-        return
+        return False
+    size = frame_size( info, args)
+    try :
+        frames = select_frames( args.frames, len( array) // size)
+    except ValueError :
+        print( "ERROR: invalid frame selection '" + args.frames + "'", file = sys.stderr)
+        exit( 1)
+    if len( frames) <= 0 :
+        print( "Warning: no frame selected from input file '" + filename + "'", file = sys.stderr)
+        return False
+    result = True
+    for idx, frame in enumerate( frames) :
+        # frames are slices of the mapped input, only the pages of selected ones get loaded:
+        data = array[ frame * size : ( frame + 1) * size]
+        if not process_raw( data, filename, args, frame, args.concat and idx > 0) :
+            result = False
+    return result
+
+def unpack_raw( rows, width, packing) :
+    # MIPI packing keeps the high 8 bits of each pixel in its own byte, low bits share the last byte:
+    groups = rows.reshape( rows.shape[ 0], -1, RAW_PACKINGS[ packing][ 1])
+    pixels = RAW_PACKINGS[ packing][ 0]
+    low_bits = ( groups.shape[ 2] - pixels) * 8 // pixels
+    shifts = np.arange( 0, 8, low_bits, dtype = np.uint8)
+    mat = np.empty( ( groups.shape[ 0], groups.shape[ 1], pixels), dtype = np.uint16)
+    mat[ ...] = groups[ :, :, : pixels]
+    mat <<= low_bits
+    mat |= ( groups[ :, :, pixels :] >> shifts) & ( ( 1 << low_bits) - 1)
+    return mat.reshape( groups.shape[ 0], -1)[ :, : width]
+
+def pack_raw( mat, packing) :
+    height, width = mat.shape
+    pixels, group = RAW_PACKINGS[ packing]
+    low_bits = ( group - pixels) * 8 // pixels
+    shifts = np.arange( 0, 8, low_bits, dtype = np.uint16)
+    padded = np.zeros( ( height, ( width + pixels - 1) // pixels * pixels), dtype = np.uint16)
+    padded[ :, : width] = mat
+    values = padded.reshape( height, -1, pixels)
+    packed = np.empty( ( height, values.shape[ 1], group), dtype = np.uint8)
+    packed[ :, :, : pixels] = values >> low_bits
+    packed[ :, :, pixels] = np.bitwise_or.reduce( ( values & ( ( 1 << low_bits) - 1)) << shifts, axis = 2)
+    return packed.reshape( height, -1)
+
+def demosaic( mosaic, norm_max, args) :
+    code = getattr( cv, BAYER_CODES[ args.bayer])
+    bgr = cv.cvtColor( mosaic, code)
+    if bgr.dtype == np.uint8 and norm_max <= 0 :
+        return bgr
+    # opencv interpolates 8 and 16-bit samples, scale to 8-bit afterwards:
+    return np.clip( np.rint( normalize( bgr, norm_max, args)), 0, 255).astype( np.uint8)
+
+# views of the pixels in input layout, info must be sized by get_size() already:
+def raw_planes( array, info, args) :
     stride = int( info[ "stride"])
     scanline = int( info[ "scanline"])
-    w = int( info[ "width"])
-    h = int( info[ "height"])
+    x0, y0, step, w, h = raw_region( info)
+    out_w = int( info[ "width"])
+    out_h = int( info[ "height"])
+    if args.input_type in YUV420_TYPES + YUV422_TYPES :
+        return yuv_planes( array, info, args)
+    mat = array[ : stride * scanline].reshape( scanline, stride)[ : h]
+    # bayer mosaics are picked in whole 2x2 cells, anything else pixel by pixel:
+    select = pick_cells if args.bayer else pick
     if args.input_type == "u8" :
-        mat = array[ : stride * scanline].reshape( scanline, stride)
-        mat = mat[ :h, :w]
-        mat = normalize( mat, info, args)
+        return select( mat[ :, : w], y0, x0, step, out_h, out_w)
     elif args.input_type == "u16" :
-        mat = array[ : stride * scanline].reshape( scanline, stride)
-        mat = mat[ : h, : w * 2]
-        mat = np.frombuffer( mat.data, dtype = np.uint16)
-        mat = mat.reshape( h, w)
-        mat = normalize( mat, info, args)
+        return select( mat[ :, : w * 2].view( np.uint16), y0, x0, step, out_h, out_w)
     elif args.input_type == "u32" :
-        mat = array[ : stride * scanline].reshape( scanline, stride)
-        mat = mat[ : h, : w * 4]
-        mat = np.frombuffer( mat.data, dtype = np.uint32)
-        mat = mat.reshape( h, w)
-        mat = normalize( mat, info, args)
+        return select( mat[ :, : w * 4].view( np.uint32), y0, x0, step, out_h, out_w)
     elif args.input_type == "f32" :
-        mat = array[ : stride * scanline].reshape( scanline, stride)
-        mat = mat[ : h, : w * 4]
-        mat = np.frombuffer( mat.data, dtype = np.float32)
-        mat = mat.reshape( h, w)
-        mat = normalize( mat, info, args)
-    elif args.input_type == "bgr" :
-        mat = array[ : stride * scanline].reshape( scanline, stride)
-        mat = mat[ : h, : w * 3].reshape( h, w, 3)
-        mat = normalize( mat, info, args)
+        return select( mat[ :, : w * 4].view( np.float32), y0, x0, step, out_h, out_w)
+    elif args.input_type in RAW_PACKINGS :
+        # unpack only the rows and the groups of pixels the region needs:
+        pixels, group = info[ "packing"]
+        if args.bayer :
+            rows = mat[ y0 : y0 + ( out_h // 2 - 1) * step * 2 + 2]
+            right = x0 + ( out_w // 2 - 1) * step * 2 + 2
+        else :
+            rows = mat[ y0 : y0 + ( out_h - 1) * step + 1 : step]
+            right = x0 + ( out_w - 1) * step + 1
+        first = x0 // pixels
+        last = ( right + pixels - 1) // pixels
+        plane = unpack_raw( rows[ :, first * group : last * group], ( last - first) * pixels, args.input_type)
+        if args.bayer :
+            return pick_cells( plane, 0, x0 - first * pixels, step, out_h, out_w)
+        return plane[ :, x0 - first * pixels :: step][ :, : out_w]
+    elif args.input_type in [ "bgr", "rgb", "yuv"] :
+        return pick( mat[ :, : w * 3].reshape( h, w, 3), y0, x0, step, out_h, out_w)
+    elif args.input_type in [ "bgra", "rgba"] :
+        return pick( mat[ :, : w * 4].reshape( h, w, 4), y0, x0, step, out_h, out_w)
+    else :
+        print( "ERROR: internal error raw_planes()", file = sys.stderr)
+        exit( 1)
+
+# record value ranges into info and warn once, returns what convert_planes() needs from the whole image:
+def norm_max_of( mat_min, mat_max, info, args) :
+    info[ "range"] = "[" + str( mat_min) + "," + str( mat_max) + "]"
+    if args.normalize == None :
+        return -1
+    elif args.normalize > 0 :
+        return args.normalize
+    return mat_max
+
+def measure_raw( planes, info, args) :
+    if args.input_type in [ "u8", "u16", "u32", "f32", "raw10", "raw12"] :
+        return norm_max_of( planes.min(), planes.max(), info, args)
+    elif args.input_type in [ "bgr", "rgb", "rgba", "bgra"] :
+        if args.normalize != None :
+            print( "Warning: option -n/--normalize only works with 1-channel input, ignored.", file = sys.stderr)
+        red = 0 if args.input_type.startswith( "rgb") else 2
+        b = planes[ :, :, 2 - red]
+        g = planes[ :, :, 1]
+        r = planes[ :, :, red]
+        info[ "b_range"] = "[" + str( b.min()) + "," + str( b.max()) + "]"
+        info[ "g_range"] = "[" + str( g.min()) + "," + str( g.max()) + "]"
+        info[ "r_range"] = "[" + str( r.min()) + "," + str( r.max()) + "]"
+        if info[ "channel"] >= 4 :
+            a = planes[ :, :, 3]
+            info[ "a_range"] = "[" + str( a.min()) + "," + str( a.max()) + "]"
+        return None
+    if args.normalize != None :
+        print( "Warning: option -n, --normalize only work with 1-channel input, ignored.", file = sys.stderr)
+    fullrange = not args.input_yuv_range or args.input_yuv_range.startswith( "full")
+    if args.input_type == "yuv" :
+        return check_yuv_ranges( planes[ :, :, 0], planes[ :, :, 1], planes[ :, :, 2], fullrange, info)
+    return check_yuv_ranges( planes[ "y"], planes[ "u"], planes[ "v"], fullrange, info)
+
+# convert views from raw_planes() to what encode_mat() takes:
+def convert_planes( planes, info, args, measured) :
+    yuv_cs = "bt601"
+    if args.input_yuv_color :
+        yuv_cs = args.input_yuv_color
+    yuv_fullrange = True
+    if args.input_yuv_range and not args.input_yuv_range.startswith( "full") :
+        yuv_fullrange = False
+    if args.bayer :
+        return demosaic( planes, measured, args)
+    elif "unit" in info :
+        return planes
+    elif args.input_type in [ "u8", "u16", "u32", "f32", "raw10", "raw12"] :
+        return normalize( planes, measured, args)
+    elif args.input_type in [ "bgr", "bgra"] :
+        return planes
     elif args.input_type == "rgb" :
-        mat = array[ : stride * scanline].reshape( scanline, stride)
-        mat = mat[ : h, : w * 3].reshape( h, w, 3)
-        mat = cv.cvtColor( mat, cv.COLOR_RGB2BGR)
-        mat = normalize( mat, info, args)
+        return cv.cvtColor( planes, cv.COLOR_RGB2BGR)
     elif args.input_type == "rgba" :
-        mat = array[ : stride * scanline].reshape( scanline, stride)
-        mat = mat[ : h, : w * 4].reshape( h, w, 4)
-        mat = cv.cvtColor( mat, cv.COLOR_RGBA2BGRA)
-        mat = normalize( mat, info, args)
-    elif args.input_type == "bgra" :
-        mat = array[ : stride * scanline].reshape( scanline, stride)
-        mat = mat[ : h, : w * 4].reshape( h, w, 4)
-        mat = normalize( mat, info, args)
+        return cv.cvtColor( planes, cv.COLOR_RGBA2BGRA)
     elif args.input_type == "yuv" :
-        mat = array[ : stride * scanline].reshape( scanline, stride)
-        mat = mat[ : h, : w * 3].reshape( h, w, 3)
-        mat = yuv2bgr( mat, yuv_cs, yuv_fullrange, info, args)
-    elif args.input_type.startswith( "nv") :
-        y = array[ : stride * scanline].reshape( scanline, stride)
-        y = y[ : h, : w]
-        uv = array[ stride * scanline: stride * scanline * 3 // 2].reshape( scanline // 2, stride)
-        uv = uv[ : h // 2, : w]
-        u = uv[ :, ::2]
-        v = uv[ :, 1::2]
-        if args.input_type == "nv21" :
-            u, v = v, u
-        yuv = np.empty( ( h, w, 3), dtype = np.uint8)
-        yuv[ :, :, 0] = y
-        yuv[ ::2, ::2, 1] = u
-        yuv[ ::2, 1::2, 1] = u
-        yuv[ 1::2, ::2, 1] = u
-        yuv[ 1::2, 1::2, 1] = u
-        yuv[ ::2, ::2, 2] = v
-        yuv[ ::2, 1::2, 2] = v
-        yuv[ 1::2, ::2, 2] = v
-        yuv[ 1::2, 1::2, 2] = v
-        mat = yuv2bgr( yuv, yuv_cs, yuv_fullrange, info, args)
+        return yuv_transform( planes, yuv_cs, yuv_fullrange)
+    elif args.input_type in YUV420_TYPES + YUV422_TYPES :
+        return subsampled2bgr( planes, args.input_type, yuv_cs, yuv_fullrange, measured)
+    else :
+        print( "ERROR: internal error convert_planes()", file = sys.stderr)
+        exit( 1)
+
+def decode_raw( array, info, args) :
+    planes = raw_planes( array, info, args)
+    return convert_planes( planes, info, args, measure_raw( planes, info, args))
+
+def process_raw( array, filename, args, frame = None, append = False) :
+    info = raw_format( args)
+    info[ "filename"] = os.path.basename( filename)
+    info[ "frame"] = frame
+    info[ "append"] = append
+    if not get_size( array, info, args) :
+        print( "Warning: invalid size configuration for input file '" + filename + "'", file = sys.stderr)
+        return False
+    if not roi_or_exit( info, args) :
+        print( "Warning: crop region is outside of input file '" + filename + "'", file = sys.stderr)
+        return False
+    if args.band > 0 and "roi" in info :
+        print( "Warning: cropped or decimated input cannot be converted in bands, converting '" + info[ "filename"] + "' as a whole.",
+                file = sys.stderr)
+    banded = []
+    whole = []
+    for out_args in output_args( args) :
+        if args.band > 0 and "roi" not in info and can_band( output_info( info, out_args), out_args) :
+            banded.append( out_args)
+        else :
+            whole.append( out_args)
+    result = True
+    if len( banded) > 0 :
+        result = process_bands( array, info, banded)
+    mat = None
+    shared = {}
+    for out_args in whole :
+        if can_transcode( info, out_args) :
+            out_info = output_info( info, out_args)
+            if ready_to_save( out_info, out_args) :
+                data = RAW_TRANSCODERS[ ( args.input_type, out_args.output_type)]( array, out_info, out_args)
+                write_output( data, out_info, out_args)
+            continue
+        # decoded once, whatever number of outputs need it:
+        if mat is None :
+            mat = decode_raw( array, info, args)
+        if not save_mat( mat, output_info( info, out_args), out_args, shared) :
+            result = False
+    return result
+
+def can_band( info, args) :
+    to_stdout = os.path.abspath( info[ "output"]) == '/dev/stdout'
+    if args.output_type == "jpg" or ( to_stdout and args.output_type in [ "bmp"] + YUV420_TYPES) :
+        print( "Warning: " + args.output_type + " output cannot be written in bands" + ( " to stdout" if to_stdout else "") +
+                ", converting '" + info[ "filename"] + "' as a whole.", file = sys.stderr)
+        return False
+    return True
+
+def raw_band( array, info, top, rows, args) :
+    # rows [top, top + rows) as a raw image of their own, 4:2:0 chroma rows get copied next to luma:
+    stride = int( info[ "stride"])
+    band = dict( info)
+    band[ "height"] = rows
+    band[ "scanline"] = rows
+    if args.input_type in YUV420_TYPES :
+        # nv has one chroma plane of full stride, i420/yv12 two of half stride:
+        planes = 1 if args.input_type.startswith( "nv") else 2
+        plane_stride = stride // planes
+        plane_start = stride * int( info[ "scanline"])
+        parts = [ array[ top * stride : ( top + rows) * stride]]
+        for idx in range( planes) :
+            start = plane_start + idx * plane_stride * ( int( info[ "scanline"]) // 2)
+            parts.append( array[ start + top // 2 * plane_stride : start + ( top + rows) // 2 * plane_stride])
+        return np.concatenate( parts), band
+    return array[ top * stride : ( top + rows) * stride], band
+
+def open_strip_writer( info, args, data) :
+    channel = data.shape[ 2] if data.ndim > 2 else 1
+    if args.output_type == "png" :
+        return PngStripWriter( info, channel, data.dtype)
+    elif args.output_type == "bmp" :
+        return BmpStripWriter( info, channel)
+    elif args.output_type in YUV420_TYPES :
+        return Yuv420StripWriter( info, 1 if args.output_type.startswith( "nv") else 2)
+    return None
+
+def measure_bands( array, info, args, rows) :
+    # 1-channel input measured band by band, so packed input never gets unpacked as a whole;
+    #   without -n the range is only shown by -v, unit scaled output does not need it.
+    if args.normalize is None and not args.verbose :
+        return -1
+    mat_min = None
+    mat_max = None
+    h = int( info[ "height"])
+    for top in range( 0, h, rows) :
+        array_band, band = raw_band( array, info, top, min( rows, h - top), args)
+        planes = raw_planes( array_band, band, args)
+        mat_min = planes.min() if mat_min is None else min( mat_min, planes.min())
+        mat_max = planes.max() if mat_max is None else max( mat_max, planes.max())
+    return norm_max_of( mat_min, mat_max, info, args)
+
+def process_bands( array, info, targets) :
+    # targets are output_args() copies, each band is decoded once for all of them:
+    args = targets[ 0]
+    transcoders = [ RAW_TRANSCODERS[ ( args.input_type, out_args.output_type)] if can_transcode( info, out_args) else None
+                    for out_args in targets]
+    # even bands never split the rows sharing 4:2:0 chroma or a bayer cell:
+    rows = args.band + args.band % 2
+    measured = None
+    if None in transcoders :
+        # measure the whole image first, so all bands share one scaling and warnings show once:
+        if args.input_type in [ "u8", "u16", "u32", "f32"] + list( RAW_PACKINGS) :
+            measured = measure_bands( array, info, args, rows)
+        else :
+            measured = measure_raw( raw_planes( array, info, args), info, args)
+    outputs = []
+    for out_args, transcoder in zip( targets, transcoders) :
+        out_info = output_info( info, out_args)
+        if ready_to_save( out_info, out_args) :
+            # the last item becomes the strip writer, or False for outputs written band after band:
+            outputs.append( [ out_info, out_args, transcoder, None])
+    if len( outputs) <= 0 :
+        return True
+    h = int( info[ "height"])
+    # demosaicing looks at neighbour rows, decode a margin around each band and drop it afterwards:
+    margin = 2 if args.bayer else 0
+    try :
+        for top in range( 0, h, rows) :
+            first = max( top - margin, 0)
+            last = min( top + rows + margin, h)
+            array_band, band = raw_band( array, info, first, last - first, args)
+            mat = None
+            shared = {}
+            for output in outputs :
+                out_info, out_args, transcoder, writer = output
+                out_band = dict( band)
+                out_band[ "output"] = out_info[ "output"]
+                out_band[ "append"] = info.get( "append", False) or top > 0
+                if transcoder is not None :
+                    data = transcoder( array_band, out_band, out_args)
+                else :
+                    if mat is None :
+                        mat = convert_planes( raw_planes( array_band, band, args), band, args, measured)
+                        mat = mat[ top - first : top - first + rows]
+                    out_band[ "height"] = mat.shape[ 0]
+                    if out_args.output_type in [ "png", "bmp"] :
+                        data = image_mat( mat, out_band, out_args)
+                    else :
+                        data = encode_mat( mat, out_band, out_args, shared)
+                    if data is None :
+                        return False
+                if writer is None :
+                    wait_output( out_args)
+                    writer = open_strip_writer( out_info, out_args, data) or False
+                    output[ 3] = writer
+                if writer :
+                    writer.write( data, top)
+                else :
+                    write_output( data, out_band, out_args)
+    finally :
+        for output in outputs :
+            if output[ 3] :
+                output[ 3].close()
+    return True
+
+def raw_buffer( data, args) :
+    # raw input as flat bytes, an image shaped array gives its height unless sizes are given:
+    if not isinstance( data, np.ndarray) :
+        return np.frombuffer( data, dtype = np.uint8)
+    if data.ndim >= 2 and not args.row and not args.scanline :
+        args.row = data.shape[ 0] * 2 // 3 if args.input_type in YUV420_TYPES else data.shape[ 0]
+    return np.ascontiguousarray( data).reshape( -1).view( np.uint8)
+
+# convert one image held in memory, nothing is read from or written to files:
+#   data is bytes-like or numpy array, encoded jpg/png/bmp, csv text/array or raw pixels;
+#   options are the long command line options, like normalize or input_yuv_range;
+#   returns bytes for jpg/png/bmp/csv output and numpy array for raw output.
+def convert( data, input_type, output_type, width = 0, height = 0, stride = None, scanline = None, jump_through = 0, **options) :
+    for image_type in [ input_type, output_type] :
+        if image_type not in IMAGE_TYPES :
+            raise ValueError( "unknown image type '" + str( image_type) + "'")
+    args = build_parser().parse_args( [ "-i", input_type, "-o", output_type])
+    args.col = width
+    args.row = height
+    args.stride = stride
+    args.scanline = scanline
+    args.jump_through = jump_through
+    args.no_cache = True
+    for key, value in options.items() :
+        if not hasattr( args, key) :
+            raise TypeError( "convert() got an unexpected option '" + key + "'")
+        setattr( args, key, value)
+    info = { "filename" : "<memory>", "output" : "<memory>"}
+    if input_type in [ "jpg", "png", "bmp"] :
+        mat = cv.imdecode( np.frombuffer( data, dtype = np.uint8)[ jump_through :], cv.IMREAD_UNCHANGED)
+        if mat is None :
+            raise ValueError( "fail to decode " + input_type + " data")
+        region = image_region( mat)
+        if not apply_roi( region, args) :
+            raise ValueError( "crop region is outside of " + input_type + " data")
+        mat = decode_image( crop_region( mat, region), info, args)
+    elif input_type == "csv" :
+        if isinstance( data, np.ndarray) :
+            sheet = data[ jump_through :].astype( np.float32)
+        else :
+            text = data if isinstance( data, str) else bytes( data).decode()
+            sheet = read_csv( io.StringIO( text, newline = ''), jump_through, text.count( '\n') + 1)
+        if args.normalize is None:
+            args.normalize = 0
+        region = image_region( sheet)
+        if not apply_roi( region, args) :
+            raise ValueError( "crop region is outside of " + input_type + " data")
+        mat = decode_image( crop_region( sheet, region), info, args)
     else :
-        print( "ERROR: internal error process_raw()", file = sys.stderr)
+        if args.bayer and input_type not in BAYER_INPUT_TYPES :
+            raise ValueError( "option bayer only works with " + ", ".join( BAYER_INPUT_TYPES) + " input")
+        array = raw_buffer( data, args)[ jump_through :]
+        info.update( raw_format( args))
+        if not get_size( array, info, args) :
+            raise ValueError( "invalid size configuration for " + input_type + " data")
+        if not apply_roi( info, args) :
+            raise ValueError( "crop region is outside of " + input_type + " data")
+        if can_transcode( info, args) :
+            return RAW_TRANSCODERS[ ( input_type, output_type)]( array, info, args)
+        mat = decode_raw( array, info, args)
+    result = encode_mat( mat, info, args)
+    if result is None :
+        raise ValueError( "fail to encode " + output_type + " data")
+    if input_type not in [ "jpg", "png", "bmp", "csv"] and np.may_share_memory( result, array) :
+        # integer input may pass through untouched, hand back an array of our own:
+        result = result.copy()
+    if output_type == "csv" :
+        out = io.StringIO()
+        write_csv( result, out)
+        return out.getvalue().encode()
+    if output_type in [ "jpg", "png", "bmp"] :
+        return result.tobytes()
+    return result
+
+def read_exactly( stream, size) :
+    # pipes return short reads, keep going until the frame is full or input ends:
+    data = np.empty( size, dtype = np.uint8)
+    view = memoryview( data)
+    filled = 0
+    while filled < size :
+        count = stream.readinto( view[ filled :])
+        if not count :
+            break
+        filled += count
+    return data[ : filled]
+
+def process_pipe( args) :
+    if args.input_type in [ "jpg", "png", "bmp", "csv"] :
+        print( "ERROR: only raw input types can be read from stdin", file = sys.stderr)
+        exit( 1)
+    if not ( args.col and args.row) and not ( args.stride and args.scanline) :
+        print( "ERROR: reading from stdin needs -c/-r or -s/-l to size each frame", file = sys.stderr)
         exit( 1)
-    prepare_save( info, args)
-    save_mat( mat, info, args)
+    info = raw_format( args)
+    width = args.col if args.col else row_pixels( args.stride, info)
+    info[ "stride"] = args.stride if args.stride else row_bytes( width, info)
+    info[ "scanline"] = args.scanline if args.scanline else args.row
+    size = frame_size( info, args)
+    if not args.path :
+        if len( args.output_types) > 1 :
+            print( "ERROR: several output types from stdin need -p PATH", file = sys.stderr)
+            exit( 1)
+        args.path = "/dev/stdout"
+    stdin = sys.stdin.buffer
+    if args.jump_through > 0 :
+        read_exactly( stdin, args.jump_through)
+    result = True
+    frame = 0
+    while True :
+        data = read_exactly( stdin, size)
+        if len( data) <= 0 :
+            break
+        if len( data) < size :
+            print( "Warning: incomplete frame " + str( frame) + " at end of stdin, ignored.", file = sys.stderr)
+            return False
+        if not process_raw( data, "stdin", args, frame, args.concat and frame > 0) :
+            result = False
+        frame += 1
+    return result
 
 def process( filename, args) :
+    if filename == "-" :
+        return process_pipe( args)
     if not os.path.isfile( filename) :
         print( "Warning: input file '" + filename + "' does not exist, ignored.", file = sys.stderr)
-        return
+        return False
     try :
         if args.input_type == 'csv':
-            import csv
-            with open( filename, 'r') as csv_file:
-                dialect = csv.Sniffer().sniff( csv_file.read())
-                csv_file.seek( 0)
-                reader = csv.reader( csv_file, dialect)
-                jump_through = args.jump_through
-                sheet = []
-                for row in reader:
-                    if jump_through > 0:
-                        jump_through -= 1
-                        continue
-                    row_data = []
-                    for data in row:
-                        row_data.append( float( data))
-                    if len( row_data) > 0:
-                        sheet.append( row_data)
-                        if len( row_data) != len( sheet[ 0]):
-                            print( "ERROR: inconsistent number column within csv file!", file = sys.stderr)
-                            exit( 1)
-                array = np.array( sheet, dtype = np.float32)
-        elif args.jump_through > 0:
-            with open( filename, 'rb') as inp:
-                inp.seek( args.jump_through)
-                array = np.fromfile( inp, dtype = np.uint8)
+            array = load_csv( filename, args.jump_through)
+        elif overwrites_input( filename, args) :
+            array = np.fromfile( filename, dtype = np.uint8, offset = args.jump_through)
         else:
-            array = np.fromfile( filename, dtype = np.uint8)
+            array = map_file( filename, args.jump_through)
+    except ValueError as e :
+        print( "Warning: " + str( e) + " file '" + filename + "', ignored.", file = sys.stderr)
+        return False
     except :
         print( "Warning: cannot read from file '" + filename + "', ignored.", file = sys.stderr)
-        return
+        return False
 
     if args.input_type in [ "jpg", "png", "bmp"] :
         # use imdecode() instead of imread() to avoid failure of opencv with non-ascii path
         mat = cv.imdecode( array, cv.IMREAD_UNCHANGED)
         if mat is None :
             print( "Warning: fail to decode image '" + filename + "', ignored.", file = sys.stderr)
-            return
-        process_image( mat, filename, args)
+            return False
+        return process_image( mat, filename, args)
     elif args.input_type == "csv":
         if args.normalize is None:
             args.normalize = 0
-        process_image( array, filename, args)
+        return process_image( array, filename, args)
+    elif args.frames is not None :
+        return process_frames( array, filename, args)
     else :
-        process_raw( array, filename, args)
+        return process_raw( array, filename, args)
 
 def process_all( files, args):
-    if args.path and not os.path.isdir( args.path) and ( len( files) > 1 or args.path.endswith('/') or args.path.endswith('\\')):
+    if len( args.output_types) > 1 and ( args.suffix is not None or is_same_path( args.path if args.path else ".", '/dev/stdout')) :
+        print( "ERROR: several output types need an output folder, without -x/--suffix", file = sys.stderr)
+        exit( 1)
+    if args.path and not os.path.isdir( args.path) and ( len( files) > 1 or len( args.output_types) > 1 or args.path.endswith('/') or args.path.endswith('\\')):
         try:
             os.makedirs( args.path)
         except Exception as e:
             print( "ERROR: failed creating output folder: " + str( e), file = sys.stderr)
             exit( 1)
+    if args.jobs != 1 and len( files) > 1 and not is_same_path( args.path if args.path else ".", '/dev/stdout') :
+        return process_parallel( files, args)
+    failures = 0
+    args.writer = OutputWriter( OUTPUT_QUEUE_DEPTH)
+    try :
+        for file in files :
+            if not process( file, args) :
+                failures += 1
+    finally :
+        # everything is on disk before returning, failed writes count as failed files:
+        failures += args.writer.close()
+        args.writer = None
+    return failures
+
+def confirm_overwrite( files, args) :
+    # ask once for all existing outputs, since workers cannot prompt:
+    existing = []
     for file in files :
-        process( file, args)
+        for out_args in output_args( args) :
+            info = output_info( { "filename" : os.path.basename( file)}, out_args)
+            if os.path.exists( info[ "output"]) and not is_same_path( info[ "output"], '/dev/stdout') :
+                existing.append( file)
+                break
+    if len( existing) <= 0 or args.force :
+        return files
+    if prompt( str( len( existing)) + " output file(s) already exist, overwrite?", True) :
+        args.force = True
+        return files
+    return [ file for file in files if file not in existing]
 
-def main( args) :
+def process_captured( task) :
+    # run process() in a worker, capturing its messages so they can be replayed in input order:
+    filename, args = task
+    out = io.StringIO()
+    err = io.StringIO()
+    saved_out, saved_err = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = out, err
+    try :
+        result = process( filename, args)
+    except SystemExit :
+        result = False
+    except Exception as e :
+        print( "ERROR: failed processing file '" + filename + "': " + str( e), file = sys.stderr)
+        result = False
+    finally :
+        sys.stdout, sys.stderr = saved_out, saved_err
+    return result, out.getvalue(), err.getvalue()
+
+def process_parallel( files, args) :
+    import multiprocessing
+    files = confirm_overwrite( files, args)
+    jobs = args.jobs if args.jobs > 0 else multiprocessing.cpu_count()
+    failures = 0
+    pool = multiprocessing.Pool( min( jobs, max( len( files), 1)))
+    try :
+        for result, out, err in pool.imap( process_captured, [ ( file, args) for file in files]) :
+            sys.stdout.write( out)
+            sys.stderr.write( err)
+            if not result :
+                failures += 1
+    finally :
+        pool.close()
+        pool.join()
+    return failures
+
+class Inotify( object) :
+    # wakes the watch loop when a file shows up in or is written to the folders, through libc:
+    MASK = 0x8 | 0x80 | 0x100 # IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    def __init__( self, folders) :
+        import ctypes, ctypes.util
+        libc = ctypes.CDLL( ctypes.util.find_library( "c"), use_errno = True)
+        self.fd = libc.inotify_init1( os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0 :
+            raise OSError( ctypes.get_errno(), "inotify_init1() failed")
+        for folder in folders :
+            if libc.inotify_add_watch( self.fd, os.fsencode( folder), self.MASK) < 0 :
+                os.close( self.fd)
+                raise OSError( ctypes.get_errno(), "inotify_add_watch() failed")
+
+    def wait( self, timeout) :
+        import select
+        ready, _, _ = select.select( [ self.fd], [], [], timeout)
+        if ready :
+            # only waking up matters, the folders get scanned anyway:
+            try :
+                while os.read( self.fd, 1 << 16) :
+                    pass
+            except BlockingIOError :
+                pass
+
+    def close( self) :
+        os.close( self.fd)
+
+class Polling( object) :
+    # same for systems without inotify:
+    def wait( self, timeout) :
+        time.sleep( WATCH_SETTLE)
+
+    def close( self) :
+        pass
+
+def open_watcher( folders) :
+    try :
+        return Inotify( folders)
+    except ( OSError, AttributeError, TypeError) :
+        return Polling()
+
+def load_watch_state( filename) :
+    try :
+        with open( filename, "r") as inp :
+            return json.load( inp)
+    except :
+        return {}
+
+def save_watch_state( filename, state) :
+    # inputs removed meanwhile are dropped, keeps the file small:
+    state = { path : stamp for path, stamp in state.items() if os.path.exists( path)}
+    try :
+        temp = filename + "." + str( os.getpid())
+        with open( temp, "w") as out :
+            json.dump( state, out, indent = 1, sort_keys = True)
+        os.replace( temp, filename)
+    except Exception as e :
+        print( "Warning: failed saving watch state: " + str( e), file = sys.stderr)
+
+def watch_convert( files, args) :
+    # one bad file must not stop the watch, it only counts as failed:
+    if args.jobs != 1 and len( files) > 1 :
+        # workers catch errors of their own files already:
+        return process_all( files, args)
+    failures = 0
+    for file in files :
+        try :
+            failures += process_all( [ file], args)
+        except SystemExit :
+            failures += 1
+        except Exception as e :
+            print( "ERROR: failed processing file '" + file + "': " + str( e), file = sys.stderr)
+            failures += 1
+    return failures
+
+def watch_all( folders, args) :
+    # convert each new or changed file of the folders once it stops growing, until interrupted:
+    for folder in folders :
+        if not os.path.isdir( folder) :
+            print( "ERROR: '" + folder + "' is not a folder to watch", file = sys.stderr)
+            exit( 1)
+    if not args.path or any( is_same_path( args.path, folder) for folder in folders) :
+        print( "ERROR: --watch needs -p PATH, an output folder other than the watched ones", file = sys.stderr)
+        exit( 1)
+    if not os.path.isdir( args.path) :
+        try:
+            os.makedirs( args.path)
+        except Exception as e:
+            print( "ERROR: failed creating output folder: " + str( e), file = sys.stderr)
+            exit( 1)
+    # a changed input replaces what it was converted to before:
+    args.force = True
+    state_file = os.path.join( args.path, WATCH_STATE)
+    done = load_watch_state( state_file)
+    pending = {}
+    failures = 0
+    watcher = open_watcher( folders)
+    try :
+        while True :
+            now = time.monotonic()
+            ready = []
+            growing = {}
+            for folder in folders :
+                for entry in os.scandir( folder) :
+                    if entry.name.startswith( ".") or not entry.is_file() :
+                        continue
+                    path = os.path.abspath( entry.path)
+                    try :
+                        stat = entry.stat()
+                    except OSError :
+                        # renamed or removed since the scan:
+                        continue
+                    stamp = [ stat.st_size, stat.st_mtime_ns]
+                    if done.get( path) == stamp :
+                        continue
+                    if path in pending and pending[ path][ 0] == stamp :
+                        if now - pending[ path][ 1] >= WATCH_SETTLE :
+                            ready.append( ( path, stamp))
+                            continue
+                        growing[ path] = pending[ path]
+                    else :
+                        growing[ path] = ( stamp, now)
+            pending = growing
+            if len( ready) > 0 :
+                failures += watch_convert( [ path for path, stamp in sorted( ready)], args)
+                # failed ones too, they are tried again once they change:
+                for path, stamp in ready :
+                    done[ path] = stamp
+                save_watch_state( state_file, done)
+            watcher.wait( WATCH_SETTLE if len( pending) > 0 else None)
+    except KeyboardInterrupt :
+        pass
+    finally :
+        watcher.close()
+    return failures
+
+class OutputTypesAction( argparse.Action) :
+    # -o takes a comma separated list, output_type keeps the first for code that handles one output:
+    def __call__( self, parser, namespace, values, option_string = None) :
+        output_types = []
+        for output_type in values.split( ",") :
+            if output_type not in IMAGE_TYPES :
+                parser.error( "argument -o/--output-type: invalid choice: '" + output_type + "' (choose from " +
+                        ", ".join( IMAGE_TYPES) + ")")
+            if output_type not in output_types :
+                output_types.append( output_type)
+        namespace.output_types = output_types
+        namespace.output_type = output_types[ 0]
+
+def build_parser() :
     parser = argparse.ArgumentParser( description = DESC_STR, usage = USAGE_STR)
     parser.add_argument( "-p", "--path",
             help = "output file or directory path")
@@ -835,8 +2180,8 @@ def main( args) :
             help = "image scanline, lines of data")
     parser.add_argument( "-i", "--input-type", choices = IMAGE_TYPES, required = True,
             help = "data format of input image")
-    parser.add_argument( "-o", "--output-type", choices = IMAGE_TYPES, required = True,
-            help = "data format of output image")
+    parser.add_argument( "-o", "--output-type", action = OutputTypesAction, required = True, metavar = "FORMAT[,FORMAT...]",
+            help = "data format(s) of output image, same choices as input, several formats are written from one decode")
     parser.add_argument( "-j", "--jump-through", type = int, default = 0,
             help = "number of bytes (or lines for csv) to jump through at the begining of input file")
     parser.add_argument( "--input-yuv-color", choices = YUV_COLOR_STDS,
@@ -847,6 +2192,8 @@ def main( args) :
             help = "color space of output yuv data, default is BT.601")
     parser.add_argument( "--output-yuv-range", choices = YUV_RANGES,
             help = "data range of output yuv data, default is full-range")
+    parser.add_argument( "--bayer", choices = sorted( BAYER_CODES),
+            help = "demosaic u8, u16, raw10 or raw12 input with this bayer pattern")
     parser.add_argument( "-n", "--normalize", type = float,
             help = "scale value with NORMALIZE as max value, do softmax if set to zero")
     parser.add_argument( "-x", "--suffix", type = str,
@@ -855,7 +2202,30 @@ def main( args) :
             help = "force to rewrite existing file(s)")
     parser.add_argument( "-v", "--verbose", action = "store_true",
             help = "display detail info of each input file(s)")
-    args, files = parser.parse_known_args( args)
+    parser.add_argument( "-B", "--band", type = int, default = 0,
+            help = "convert raw input in horizontal bands of BAND rows, bounding memory by band instead of image size")
+    parser.add_argument( "-F", "--frames", type = str,
+            help = "treat raw input as concatenated frames, convert frame N, frames START:END, or ':' for all, negative ones count from the end; " +
+                   "give a range starting negative as -F=-2: or --frames=-2:")
+    parser.add_argument( "--concat", action = "store_true",
+            help = "write all frames into one output instead of numbered ones")
+    parser.add_argument( "--no-cache", action = "store_true",
+            help = "neither use nor update the cache of auto detected image sizes")
+    parser.add_argument( "-J", "--jobs", type = int, default = 1,
+            help = "number of files to convert in parallel, use all CPUs if set to zero")
+    parser.add_argument( "--crop", type = str,
+            help = "convert only the region X,Y,W,H of the input, aligned to chroma blocks and bayer cells")
+    parser.add_argument( "--decimate", type = int, default = 1,
+            help = "keep every N-th pixel of each row and column, bayer input keeps every N-th 2x2 cell")
+    parser.add_argument( "-T", "--threads", type = int, default = 0,
+            help = "threads converting one frame, passed to cv.setNumThreads(), OpenCV's own setting if not given")
+    parser.add_argument( "--watch", action = "store_true",
+            help = "watch the FILE folder(s) and convert each new or changed file into -p PATH once it stops growing, " +
+                   "until interrupted")
+    return parser
+
+def main( args) :
+    args, files = build_parser().parse_known_args( args)
     try :
         files.remove( "--")
     except :
@@ -869,7 +2239,14 @@ def main( args) :
             else:
                 expanded_files.append( f)
         files = expanded_files
-    process_all( files, args)
+    if args.threads > 0 :
+        cv.setNumThreads( args.threads)
+    if args.watch :
+        if watch_all( files, args) > 0 :
+            exit( 2)
+        return
+    if process_all( files, args) > 0 :
+        exit( 2)
 
 if __name__ == "__main__" :
     main( sys.argv[ 1:])
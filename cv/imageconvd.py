@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+'''
+
+@File   : imageconvd.py
+@Brief  : Resident server for imageconv.py, and the client to talk to it.
+
+  imageconvd.py --serve [SOCKET]   start the server, keeps numpy, opencv
+                                   and the caches of imageconv.py warm
+  imageconvd.py ARGS ...           same arguments as imageconv.py, runs
+                                   on the server if there is one, or
+                                   locally otherwise
+
+  The socket defaults to ~/.cache/.imageconv/server.sock, or set
+  IMAGECONV_SOCKET. Reading stdin, writing stdout, overwrite prompts and
+  --watch need the terminal, so such jobs always run locally, as do jobs
+  giving -T/--threads, which would change the server for all jobs.
+
+'''
+
+import os
+import sys
+import io
+import json
+import socket
+import signal
+import threading
+
+SOCKET_PATH = os.environ.get( "IMAGECONV_SOCKET",
+        os.path.join( os.path.expanduser( "~"), ".cache", ".imageconv", "server.sock"))
+IMAGECONV = os.path.join( os.path.dirname( os.path.abspath( __file__)), "imageconv.py")
+
+def receive_all( conn) :
+    chunks = []
+    while True :
+        chunk = conn.recv( 1 << 16)
+        if not chunk :
+            break
+        chunks.append( chunk)
+    return b"".join( chunks)
+
+def connect( path) :
+    conn = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM)
+    try :
+        conn.connect( path)
+    except OSError :
+        conn.close()
+        return None
+    return conn
+
+def request( argv) :
+    conn = connect( SOCKET_PATH)
+    if conn is None :
+        return None
+    with conn :
+        conn.sendall( json.dumps( { "argv" : argv, "cwd" : os.getcwd()}).encode())
+        conn.shutdown( socket.SHUT_WR)
+        reply = receive_all( conn)
+    try :
+        return json.loads( reply.decode())
+    except ValueError :
+        return None
+
+def run_local( argv) :
+    os.execv( sys.executable, [ sys.executable, IMAGECONV] + argv)
+
+class ThreadStream( object) :
+    # stands for sys.stdout/sys.stderr, so each job thread prints into its own buffer:
+    def __init__( self, default) :
+        self.default = default
+        self.local = threading.local()
+
+    def target( self) :
+        return getattr( self.local, "stream", None) or self.default
+
+    def write( self, text) :
+        return self.target().write( text)
+
+    def flush( self) :
+        self.target().flush()
+
+    def __getattr__( self, name) :
+        return getattr( self.target(), name)
+
+def needs_terminal( imageconv, args, files) :
+    # watching runs until interrupted, which only the terminal can do:
+    if args.watch or "-" in files or os.path.abspath( args.path) == '/dev/stdout' :
+        return True
+    # cv.setNumThreads() is process wide, a job setting it would change it for all others:
+    if args.threads > 0 :
+        return True
+    if args.force :
+        return False
+    for file in files :
+        for out_args in imageconv.output_args( args) :
+            info = imageconv.output_info( { "filename" : os.path.basename( file)}, out_args)
+            if os.path.exists( info[ "output"]) :
+                return True
+    return False
+
+def run_job( imageconv, job) :
+    out = io.StringIO()
+    err = io.StringIO()
+    sys.stdout.local.stream = out
+    sys.stderr.local.stream = err
+    code = 0
+    local = False
+    try :
+        args, files = imageconv.build_parser().parse_known_args( job[ "argv"])
+        try :
+            files.remove( "--")
+        except :
+            pass
+        # the client's working directory, relative paths are resolved against it:
+        cwd = job[ "cwd"]
+        files = [ file if file == "-" else os.path.join( cwd, file) for file in files]
+        args.path = os.path.join( cwd, args.path) if args.path else cwd
+        # jobs already run side by side, a worker pool per job would oversubscribe:
+        args.jobs = 1
+        if needs_terminal( imageconv, args, files) :
+            local = True
+        elif imageconv.process_all( files, args) > 0 :
+            code = 2
+    except SystemExit as e :
+        code = e.code if isinstance( e.code, int) else ( 0 if e.code is None else 1)
+    except Exception as e :
+        print( "ERROR: " + str( e), file = sys.stderr)
+        code = 1
+    finally :
+        sys.stdout.local.stream = None
+        sys.stderr.local.stream = None
+    return { "local" : local, "code" : code, "stdout" : out.getvalue(), "stderr" : err.getvalue()}
+
+def serve_client( imageconv, conn, slots) :
+    with conn :
+        try :
+            job = json.loads( receive_all( conn).decode())
+        except ValueError :
+            return
+        with slots :
+            reply = run_job( imageconv, job)
+        conn.sendall( json.dumps( reply).encode())
+
+def stop( signum, frame) :
+    raise KeyboardInterrupt
+
+def serve( path) :
+    import imageconv
+    if os.path.exists( path) :
+        conn = connect( path)
+        if conn is not None :
+            conn.close()
+            print( "ERROR: a server is already listening on '" + path + "'", file = sys.stderr)
+            exit( 1)
+        os.remove( path)
+    folder = os.path.dirname( path)
+    if len( folder) > 0 and not os.path.isdir( folder) :
+        os.makedirs( folder)
+    sys.stdout = ThreadStream( sys.stdout)
+    sys.stderr = ThreadStream( sys.stderr)
+    # nobody can answer a prompt here:
+    sys.stdin = io.StringIO()
+    slots = threading.BoundedSemaphore( os.cpu_count() or 1)
+    server = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind( path)
+    # jobs run with our permissions, keep other users out:
+    os.chmod( path, 0o600)
+    server.listen( 64)
+    signal.signal( signal.SIGTERM, stop)
+    print( "imageconv server listening on '" + path + "'", file = sys.stderr)
+    try :
+        while True :
+            conn, _ = server.accept()
+            threading.Thread( target = serve_client, args = ( imageconv, conn, slots), daemon = True).start()
+    except KeyboardInterrupt :
+        pass
+    finally :
+        server.close()
+        os.remove( path)
+
+def main( argv) :
+    if len( argv) > 0 and argv[ 0] == "--serve" :
+        serve( argv[ 1] if len( argv) > 1 else SOCKET_PATH)
+        return
+    reply = request( argv)
+    if reply is None or reply[ "local"] :
+        run_local( argv)
+    sys.stdout.write( reply[ "stdout"])
+    sys.stderr.write( reply[ "stderr"])
+    exit( reply[ "code"])
+
+if __name__ == "__main__" :
+    main( sys.argv[ 1:])
+
+# EOF
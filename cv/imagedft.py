@@ -15,7 +15,6 @@ import os, sys
 import glob
 import math
 import numpy as np
-import cv2
 
 def prompt( msg, default) :
     if sys.version_info.major <= 2:
@@ -32,6 +31,7 @@ def prompt( msg, default) :
         return prompt( msg, default)
 
 def dft_spectrum( mat, target_range = 255):
+    import cv2
     height, width = mat.shape[:2]
     padded_height = cv2.getOptimalDFTSize( height)
     padded_width = cv2.getOptimalDFTSize( width)
@@ -79,6 +79,8 @@ if __name__ == '__main__':
                 expanded_files.append( raw_path)
         files = expanded_files
 
+    # heavy imports only once there is work to do:
+    import cv2
     for idx, path in enumerate( files):
         print( '[%2d%%] %s ...' % ( idx * 100 / len( files), path))
         if len( args.output) > 0:
@@ -15,8 +15,6 @@ import os, sys
 import glob
 import math
 import numpy as np
-import cv2
-import matplotlib.pyplot as plt
 
 COLORS = [
     '#069af3', # azure
@@ -93,6 +91,9 @@ if __name__ == '__main__':
         print( "ERROR: no images found!", file = sys.stderr)
         exit( 1)
 
+    # heavy imports only once there is work to do:
+    import cv2
+    import matplotlib.pyplot as plt
     plt.rcParams[ 'axes.unicode_minus'] = False
     plt.rcParams[ 'font.sans-serif'] = [ 'SimHei', 'Heiti TC', 'Adobe Heiti Std', 'Adobe Fan Heiti Std']
     fig, ax_left = plt.subplots()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+'''
+
+@File   : startup_bench.py
+@Brief  : Measure start-up time of the scripts in cv/, each run is a fresh
+          interpreter so import costs are counted the way a batch wrapper
+          sees them.
+
+'''
+
+from __future__ import print_function, division
+import os, sys
+import time
+import datetime
+import tempfile
+import subprocess
+
+HERE = os.path.dirname( os.path.abspath( __file__))
+
+def cases( workdir):
+    raw = os.path.join( workdir, 'input.u16')
+    with open( raw, 'wb') as out:
+        out.write( bytes( 64 * 48 * 2))
+    return [
+        ( 'imageconv.py', '--help', [ '-h']),
+        ( 'imageconv.py', 'u16 to u8', [ '-f', '-c', '64', '-i', 'u16', '-o', 'u8', '-p', workdir, raw]),
+        ( 'imagehist.py', '--help', [ '-h']),
+        ( 'imagedft.py', '--help', [ '-h']),
+        ( 'image2gif.py', '--help', [ '-h']),
+    ]
+
+def run_once( script, argv):
+    start = time.perf_counter()
+    ret = subprocess.call( [ sys.executable, os.path.join( HERE, script)] + argv,
+                            stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+    return ( time.perf_counter() - start) * 1000, ret
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument( '-n', '--runs', type = int, default = 5, help = 'runs of each case, the first one is the cold start')
+    parser.add_argument( '-o', '--output', type = str, default = '', help = 'append results to this csv file')
+    parser.add_argument( '-b', '--budget', type = float, default = 0, help = 'fail if the median of any case exceeds BUDGET ms')
+    args = parser.parse_args()
+
+    stamp = datetime.datetime.now().strftime( '%Y-%m-%d %H:%M:%S')
+    records = []
+    over_budget = False
+    workdir = tempfile.mkdtemp( prefix = 'startup_bench_')
+    try:
+        for script, name, argv in cases( workdir):
+            times = []
+            for _ in range( max( args.runs, 1)):
+                elapsed, ret = run_once( script, argv)
+                if ret != 0:
+                    print( "WARNING: '%s' (%s) exited with %d" % ( script, name, ret), file = sys.stderr)
+                times.append( elapsed)
+            median = sorted( times)[ len( times) // 2]
+            print( '%-14s %-10s cold %8.1f ms   median %8.1f ms' % ( script, name, times[ 0], median))
+            records.append( '%s,%s,%s,%.1f,%.1f\n' % ( stamp, script, name, times[ 0], median))
+            if args.budget > 0 and median > args.budget:
+                over_budget = True
+    finally:
+        for name in os.listdir( workdir):
+            os.remove( os.path.join( workdir, name))
+        os.rmdir( workdir)
+
+    if len( args.output) > 0:
+        new_file = not os.path.isfile( args.output)
+        with open( args.output, 'a') as out:
+            if new_file:
+                out.write( 'date,script,case,cold_ms,median_ms\n')
+            out.writelines( records)
+    if over_budget:
+        print( 'ERROR: start-up time over budget of %.0f ms' % ( args.budget), file = sys.stderr)
+        exit( 1)
+
+
+# End of 'startup_bench.py'